@@ -1,15 +1,52 @@
 # app.py
 import sys
+import time
+T0 = time.perf_counter()
+import logging
 from PySide6.QtWidgets import QApplication
-from db import init_db, rotate_backups
-from ui_main import MainWindow
+from PySide6.QtCore import QObject, QEvent, QTimer
+from db import init_db
+
+STARTUP_TIMING_FLAG = "--startup-timing"   # вывести время до первой отрисовки окна и выйти
+
+
+class FirstPaintTimer(QObject):
+    """Ловит первую отрисовку окна и сообщает, сколько прошло от запуска процесса."""
+    def __init__(self, marks, quit_after=False):
+        super().__init__()
+        self.marks = marks; self.quit_after = quit_after
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self.marks.append(("первая отрисовка", time.perf_counter()))
+            parts = []; prev = T0
+            for name, t in self.marks:
+                parts.append(f"{name} {1000 * (t - prev):.0f} мс"); prev = t
+            msg = f"Запуск: {1000 * (prev - T0):.0f} мс до первой отрисовки ({', '.join(parts)})"
+            logging.info(msg)
+            if self.quit_after:
+                print(msg)
+                QTimer.singleShot(0, QApplication.quit)
+        return False
+
 
 def main():
-    rotate_backups()      # ротация backup перед любыми изменениями
-    init_db()             # создаём таблицы, если их нет
-    app = QApplication(sys.argv)
+    timing = STARTUP_TIMING_FLAG in sys.argv
+    argv = [a for a in sys.argv if a != STARTUP_TIMING_FLAG]
+    marks = [("импорт Qt", time.perf_counter())]
+    init_db()             # создаём таблицы, если их нет (один раз за запуск)
+    marks.append(("init_db", time.perf_counter()))
+    app = QApplication(argv)
+    from ui_main import MainWindow
+    marks.append(("импорт ui_main", time.perf_counter()))
     w = MainWindow()
+    marks.append(("создание окна", time.perf_counter()))
+    paint_timer = FirstPaintTimer(marks, quit_after=timing); w.installEventFilter(paint_timer)
     w.show()
+    if not timing:
+        # бэкап и прогрев тяжёлых модулей — после того, как окно показано
+        QTimer.singleShot(0, w.start_background_tasks)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+# backup.py
+"""
+Онлайн-бэкапы database.db через SQLite backup API.
+
+    python backup.py create [--gzip]
+    python backup.py list
+    python backup.py restore ФАЙЛ [--yes]
+
+Копия снимается порциями страниц (BACKUP_PAGES) с паузой между ними, поэтому приложение может
+продолжать писать в базу. Бэкапы лежат в db.BACKUP_DIR как db_<ГГГГММДДччммсс>.sqlite[.gz];
+лишние удаляются по политике хранения (apply_retention). Восстановление проверяет копию
+PRAGMA integrity_check и перед заменой сохраняет бэкап текущей базы.
+
+Хранение: 3 последних + самый свежий за каждый из 7 дней + за каждую из 4 недель — до 14 полных
+копий базы (прежний rotate_backups хранил 3). Место на диске — до 14 размеров базы; при большой
+базе уменьшите KEEP_* или делайте бэкапы с --gzip.
+"""
+import argparse
+import gzip
+import logging
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import db
+
+BACKUP_PAGES = 4096          # страниц за шаг (при странице 4 КБ — 16 МБ)
+BACKUP_SLEEP = 0.02          # пауза между шагами, с — даём писателям и диску передохнуть
+BACKUP_MAX_RESTARTS = 3      # столько раз копия может начаться заново из-за записи в базу
+KEEP_LAST = 3                # последние N бэкапов храним всегда
+KEEP_DAILY = 7               # плюс самый свежий за каждый из последних N дней
+KEEP_WEEKLY = 4              # плюс самый свежий за каждую из последних N недель
+NAME_FORMAT = "db_%Y%m%d%H%M%S"
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def _copy(src, dst, pages, sleep, progress):
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        # если базу изменило другое соединение, SQLite начинает копию заново — remaining растёт
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > BACKUP_MAX_RESTARTS:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+        if progress: progress((total - remaining) / total if total else 1.0)
+        if sleep: time.sleep(sleep)
+
+    try:
+        src.backup(dst, pages=pages, progress=step)
+    except BackupRestarted:
+        # база меняется чаще, чем успевают шаги: копируем одним шагом (в WAL это тоже не блокирует писателей)
+        logging.info("Бэкап: база меняется во время копирования, копируем одним шагом")
+        src.backup(dst, pages=-1)
+
+
+def create_backup(db_path=None, dest_dir=None, compress=False, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=None):
+    """
+    Согласованная копия базы в dest_dir (по умолчанию db.BACKUP_DIR). compress=True — gzip.
+    progress: optional callback(fraction 0..1)
+    Возвращает путь к созданному файлу.
+    """
+    db_path = Path(db_path or db.DB_PATH); dest_dir = Path(dest_dir or db.BACKUP_DIR)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    name = datetime.now().strftime(NAME_FORMAT)
+    dest = dest_dir / f"{name}.sqlite"
+    n = 1
+    while dest.exists() or dest.with_suffix(".sqlite.gz").exists():  # два бэкапа в одну секунду
+        dest = dest_dir / f"{name}_{n}.sqlite"; n += 1
+    t = time.perf_counter()
+    src = sqlite3.connect(db_path, timeout=30); dst = sqlite3.connect(dest)
+    try:
+        _copy(src, dst, pages, sleep, progress)
+    except Exception:
+        dst.close(); dest.unlink(missing_ok=True)
+        raise
+    finally:
+        src.close()
+    dst.close()
+    if compress:
+        gz = dest.with_suffix(".sqlite.gz")
+        try:
+            with open(dest, "rb") as f_in, gzip.open(gz, "wb", compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1 << 20)
+        except Exception:
+            gz.unlink(missing_ok=True)
+            raise
+        finally:
+            dest.unlink()
+        dest = gz
+    logging.info("Бэкап %s создан за %.1f с (%s байт)", dest, time.perf_counter() - t, dest.stat().st_size)
+    return dest
+
+
+def _backup_time(path):
+    stem = path.name.split(".")[0]
+    try:
+        return datetime.strptime(stem[:len("db_") + 14], NAME_FORMAT)
+    except ValueError:
+        return None
+
+
+def list_backups(dest_dir=None):
+    """[(путь, время создания, размер)] — от новых к старым."""
+    dest_dir = Path(dest_dir or db.BACKUP_DIR)
+    if not dest_dir.is_dir():
+        return []
+    out = []
+    for p in dest_dir.iterdir():
+        if p.is_file() and (p.name.endswith(".sqlite") or p.name.endswith(".sqlite.gz")):
+            when = _backup_time(p) or datetime.fromtimestamp(p.stat().st_mtime)
+            out.append((p, when, p.stat().st_size))
+    out.sort(key=lambda b: (b[1], b[0].name), reverse=True)
+    return out
+
+
+def apply_retention(dest_dir=None, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+    """Удаляет бэкапы, не попадающие в политику хранения. Возвращает список удалённых файлов."""
+    backups = list_backups(dest_dir)
+    keep = {p for p, _, _ in backups[:keep_last]}
+    days, weeks = [], []
+    for p, when, _ in backups:  # от новых к старым: первый встреченный за день / неделю — самый свежий
+        day = when.date(); week = when.isocalendar()[:2]
+        if day not in days and len(days) < keep_daily:
+            days.append(day); keep.add(p)
+        if week not in weeks and len(weeks) < keep_weekly:
+            weeks.append(week); keep.add(p)
+    removed = []
+    for p, _, _ in backups:
+        if p not in keep:
+            try:
+                p.unlink(); removed.append(p)
+            except Exception:
+                logging.exception("Не удалось удалить старый бэкап %s", p)
+    return removed
+
+
+def check_integrity(path):
+    """Результат PRAGMA integrity_check ('ok' для целой базы)."""
+    conn = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    try:
+        return "; ".join(r[0] for r in conn.execute("PRAGMA integrity_check").fetchall())
+    except sqlite3.DatabaseError as e:  # повреждён заголовок или это вообще не база
+        return str(e)
+    finally:
+        conn.close()
+
+
+def restore_backup(backup_path, db_path=None, progress=None):
+    """
+    Восстанавливает базу из бэкапа (.sqlite или .sqlite.gz).
+    Копия сначала проверяется PRAGMA integrity_check; текущая база перед заменой сохраняется отдельным бэкапом.
+    Содержимое переносится backup API в открытый файл базы, поэтому WAL и открытые соединения остаются согласованными.
+    Возвращает путь к бэкапу базы, сделанному перед восстановлением.
+    """
+    backup_path = Path(backup_path); db_path = Path(db_path or db.DB_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = backup_path
+        if backup_path.name.endswith(".gz"):
+            source = Path(tmp) / "restore.sqlite"
+            with gzip.open(backup_path, "rb") as f_in, open(source, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out, 1 << 20)
+        result = check_integrity(source)
+        if result != "ok":
+            raise ValueError(f"Бэкап {backup_path.name} повреждён: {result}")
+        safety = create_backup(db_path) if db_path.exists() else None
+        src = sqlite3.connect(source); dst = sqlite3.connect(db_path, timeout=30)
+        try:
+            src.backup(dst, pages=BACKUP_PAGES, progress=(lambda s, r, t: progress((t - r) / t if t else 1.0)) if progress else None)
+        finally:
+            dst.close(); src.close()
+    db.close_connection()
+    db.touch_catalog()
+    logging.info("База восстановлена из %s (предыдущее состояние: %s)", backup_path, safety)
+    return safety
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бэкапы базы CRM")
+    parser.add_argument("--db", help="путь к базе (по умолчанию database.db рядом с программой)")
+    parser.add_argument("--dir", help="папка бэкапов (по умолчанию backup рядом с программой)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("create", help="сделать бэкап"); p.add_argument("--gzip", action="store_true", help="сжать бэкап")
+    sub.add_parser("list", help="список бэкапов")
+    p = sub.add_parser("restore", help="восстановить базу из бэкапа")
+    p.add_argument("file"); p.add_argument("--yes", action="store_true", help="не спрашивать подтверждение")
+    args = parser.parse_args(argv)
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    if args.dir:
+        db.BACKUP_DIR = Path(args.dir)
+
+    if args.command == "create":
+        path = create_backup(compress=args.gzip)
+        removed = apply_retention()
+        print(f"Создан {path}" + (f", удалено старых: {len(removed)}" if removed else ""))
+    elif args.command == "list":
+        for path, when, size in list_backups():
+            print(f"{when:%Y-%m-%d %H:%M:%S}  {size / 1e6:10.1f} МБ  {path.name}")
+    elif args.command == "restore":
+        path = Path(args.file)
+        if not path.exists():
+            path = Path(db.BACKUP_DIR) / args.file
+        if not path.exists():
+            print(f"Файл не найден: {args.file}", file=sys.stderr); return 2
+        if not args.yes and input(f"Заменить {db.DB_PATH} содержимым {path.name}? [y/N] ").strip().lower() not in ("y", "д"):
+            return 1
+        try:
+            safety = restore_backup(path)
+        except ValueError as e:
+            print(e, file=sys.stderr); return 1
+        print(f"База восстановлена из {path.name}" + (f"; прежнее состояние сохранено в {safety.name}" if safety else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# bench_candidate_index.py
+"""
+CandidateIndex против полного перебора каталога (user-001):
+
+    python bench/bench_candidate_index.py [--products N] [--lines M]
+
+Полный перебор — прежний auto_suggest: similarity() для каждой строки поставщика с каждым товаром.
+CandidateIndex оценивает только короткий список кандидатов; в приложении он используется,
+когда rapidfuzz не установлен (иначе top_k_matches считает всю матрицу через process.cdist —
+её время печатается для сравнения). Проверяет, что лучший товар совпадает с перебором
+для всех строк с оценкой не ниже порога 85.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import logic_matching
+from logic_matching import CandidateIndex, similarity, top_k_matches
+
+WORDS = ["молоко", "кефир", "сыр", "масло", "хлеб", "сок", "вода", "чай", "кофе", "дрожжи", "сахар", "мука",
+         "йогурт", "творог", "сметана", "печенье", "крупа", "рис", "гречка", "макароны"]
+BRANDS = ["простоквашино", "агуша", "lipton", "макфа", "добрый", "мираторг", "danone", "увелка", "кубань"]
+SIZES = ["1л", "0.5л", "200г", "1кг", "330мл", "3.2%", "2.5%", "450г"]
+THRESHOLD = 85
+
+
+def catalogue(n, rng):
+    return [f"{rng.choice(WORDS)} {rng.choice(BRANDS)} {rng.choice(SIZES)} {rng.choice(WORDS)} {i % 500}" for i in range(n)]
+
+
+def supplier_lines(products, m, rng):
+    lines = []
+    for name in rng.choices(products, k=m):
+        words = name.split()
+        if rng.random() < 0.4:
+            words = words[:-1]
+        elif rng.random() < 0.3:
+            rng.shuffle(words)
+        line = " ".join(words)
+        lines.append(line.upper() if rng.random() < 0.5 else line)
+    return lines
+
+
+def brute_force(lines, products):
+    """Прежний auto_suggest: (позиция, балл) лучшего товара, при равных — первый по каталогу."""
+    out = []
+    for s in lines:
+        s = s.lower(); best = (None, 0)
+        for pos, name in enumerate(products):
+            sc = similarity(s, name.lower())
+            if sc > best[1]:
+                best = (pos, sc)
+        out.append(best)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=15000)
+    ap.add_argument("--lines", type=int, default=200)
+    args = ap.parse_args()
+    rng = random.Random(1)
+    products = catalogue(args.products, rng)
+    lines = supplier_lines(products, args.lines, rng)
+
+    t = time.perf_counter(); expected = brute_force(lines, products); t_brute = time.perf_counter() - t
+    t = time.perf_counter(); index = CandidateIndex(products); t_build = time.perf_counter() - t
+    t = time.perf_counter(); got = [index.top_k(s, 1) for s in lines]; t_index = time.perf_counter() - t
+    print(f"{args.products} товаров, {args.lines} строк поставщика")
+    print(f"полный перебор:          {t_brute:7.2f} s")
+    print(f"CandidateIndex:          {t_index:7.2f} s  (+ построение {t_build:.2f} s)")
+    if logic_matching.process is not None:
+        t = time.perf_counter(); top_k_matches(lines, products, k=1); t_cdist = time.perf_counter() - t
+        print(f"top_k_matches (cdist):   {t_cdist:7.2f} s")
+
+    checked = 0
+    for s, (pos, score), top in zip(lines, expected, got):
+        if score >= THRESHOLD:
+            checked += 1
+            assert top == [(pos, float(score))], s
+    print(f"лучший товар совпадает для всех {checked} строк с оценкой >= {THRESHOLD}")
+
+
+if __name__ == "__main__":
+    main()
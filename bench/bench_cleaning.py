@@ -0,0 +1,79 @@
+# bench_cleaning.py
+"""
+Очистка данных поставщика на синтетической накладной в 1M строк (user-022):
+
+    python bench/bench_cleaning.py [--rows N]
+
+Сравнивает прежнюю очистку (apply по строкам, пять проходов str.replace на числовую колонку;
+воспроизведена ниже) с CleaningPipeline, проверяет, что результат совпадает байт в байт,
+и печатает время по стадиям. Название — как object, так и str (pyarrow).
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from logic_import import CleaningPipeline, map_columns_by_keywords
+
+
+def prepare_before(df, mapping):
+    """Прежняя очистка (до CleaningPipeline)."""
+    proc = pd.DataFrame()
+    for file_col, logical in mapping.items():
+        if file_col in df.columns and logical in ("name", "qty", "price", "sum"):
+            proc[logical] = df[file_col]
+    proc = proc.dropna(how="all").drop_duplicates()
+    first_col = proc.columns[0]
+    is_header = proc[first_col].apply(lambda v: isinstance(v, str) and any(w in v.lower() for w in ["наим", "кол", "цена", "ед", "сум"]))
+    proc = proc[~is_header]
+    proc[first_col] = proc[first_col].astype(str).apply(lambda x: x.strip())
+    for c in ("qty", "price", "sum"):
+        if c in proc.columns:
+            proc[c] = proc[c].astype(str).str.replace('\xa0', '').str.replace(' ', '')
+            proc[c] = proc[c].str.replace(r'[^\d\.,\-]', '', regex=True).str.replace(',', '.')
+            proc[c] = pd.to_numeric(proc[c], errors='coerce').fillna(0)
+        else:
+            proc[c] = 0.0
+    return proc.reset_index(drop=True)
+
+
+def invoice(n, seed=5):
+    rng = random.Random(seed)
+    names = [f"  Товар {rng.randrange(n)} арт.{i}\xa0" for i in range(n)]
+    for i in range(0, n, 500):
+        names[i] = "Наименование товара"
+    qty = [rng.randint(1, 20) if i % 3 else f"{rng.randint(1, 20)} шт" for i in range(n)]
+    price = [f"{rng.randint(1, 99)}\xa0{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}" if i % 4 else rng.random() * 1000 for i in range(n)]
+    total = [f"{rng.randint(1, 9999)} руб." for _ in range(n)]
+    df = pd.DataFrame({'Наименование': names, 'Кол-во': pd.Series(qty, dtype=object),
+                       'Цена, руб': pd.Series(price, dtype=object), 'Сумма': total})
+    return pd.concat([df, df.iloc[:n // 20]], ignore_index=True)  # 5% дублей
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    df = invoice(args.rows)
+    mapping = map_columns_by_keywords(df)
+    same = True
+    for label, d in (("object", df), ("str", df.astype({'Наименование': 'str', 'Сумма': 'str'}))):
+        t = time.perf_counter(); before = prepare_before(d.copy(), mapping); t_before = time.perf_counter() - t
+        pipeline = CleaningPipeline(mapping)
+        t = time.perf_counter(); after = pipeline.run(d.copy()); t_after = time.perf_counter() - t
+        try:
+            pd.testing.assert_frame_equal(before, after, check_exact=True)
+        except AssertionError:
+            same = False
+        print(f"{label}: {len(d):,} строк → {len(after):,}; прежняя очистка {t_before:.2f} с, "
+              f"CleaningPipeline {t_after:.2f} с ({pipeline.report()})")
+    print(f"результат совпадает: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
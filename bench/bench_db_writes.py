@@ -0,0 +1,65 @@
+# bench_db_writes.py
+"""
+Скорость записи в price_history, строк/с (user-003):
+
+    python bench/bench_db_writes.py [--rows N]
+
+- «до»: как раньше — своё соединение, commit и close на каждую строку (журнал DELETE);
+- db.add_price_history через постоянное соединение потока, по commit на строку (WAL);
+- db.add_price_history внутри одного db.transaction().
+Базы создаются во временной папке, database.db не трогается.
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db
+
+
+def fresh_db(path):
+    db.close_connection()
+    db.DB_PATH = path
+    db.init_db()
+
+
+def report(label, rows, seconds):
+    print(f"{label:<40}{rows / seconds:>10,.0f} строк/с")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args(argv)
+    n = args.rows
+    tmp = Path(tempfile.mkdtemp())
+
+    fresh_db(tmp / "before.db"); db.close_connection()
+    conn = sqlite3.connect(tmp / "before.db"); conn.execute("PRAGMA journal_mode=DELETE"); conn.close()
+    t = time.perf_counter()
+    for i in range(n):
+        conn = sqlite3.connect(tmp / "before.db")
+        conn.execute("INSERT INTO price_history (product_id, price) VALUES (?, ?)", (1, float(i)))
+        conn.commit(); conn.close()
+    report("до: соединение на строку", n, time.perf_counter() - t)
+
+    fresh_db(tmp / "after.db")
+    t = time.perf_counter()
+    for i in range(n):
+        db.add_price_history(1, float(i))
+    report("постоянное соединение, commit на строку", n, time.perf_counter() - t)
+
+    t = time.perf_counter()
+    with db.transaction():
+        for i in range(n * 10):
+            db.add_price_history(1, float(i))
+    report("одна транзакция", n * 10, time.perf_counter() - t)
+    db.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# bench_excel_memory.py
+"""
+Пиковая память и время чтения большого .xlsx поставщика (user-021):
+
+    python bench/bench_excel_memory.py [--rows N]
+
+Генерирует прайс-лист на N строк во временной папке и в отдельных процессах (чтобы пиковый RSS
+не смешивался) сравнивает:
+- read_excel — прежний путь: pd.read_excel целиком + prepare_supplier_df;
+- stream     — read_supplier_head + prepare_supplier_file (openpyxl read_only, порциями), кэш пуст;
+- cached     — то же повторно: заголовок и очищенные данные берутся из кэша разбора.
+Проверяет, что все три результата совпадают.
+"""
+import argparse
+import pickle
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def make_xlsx(path, rows, seed=1):
+    from openpyxl import Workbook
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True); ws = wb.create_sheet()
+    ws.append(["Наименование", "Кол-во", "Цена, руб", "Сумма", "Артикул", "Примечание"])
+    for i in range(rows):
+        ws.append([f"товар {rng.randrange(rows)} арт. {i}", rng.randint(1, 9), f"{rng.randint(10, 9999)},{rng.randint(0, 99):02d}",
+                   rng.random() * 1000, f"A{i:07d}", "примечание к позиции"])
+    wb.save(path)
+
+
+def run_mode(mode, path, cache_dir, out):
+    """Выполняется в дочернем процессе: печатает время и пиковый RSS, результат — в out (pickle)."""
+    import pandas as pd
+    import logic_import
+    from logic_import import map_columns_by_keywords, prepare_supplier_df, prepare_supplier_file, read_supplier_head
+    logic_import.CACHE_DIR = Path(cache_dir)
+    t = time.perf_counter()
+    if mode == "read_excel":
+        df = pd.read_excel(path); df.columns = [str(c).strip() for c in df.columns]
+        proc = prepare_supplier_df(df, map_columns_by_keywords(df))
+    else:
+        head = read_supplier_head(path); head.columns = [str(c).strip() for c in head.columns]
+        proc = prepare_supplier_file(path, map_columns_by_keywords(head), head=head)
+    elapsed = time.perf_counter() - t
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10} {len(proc):>8} строк  {elapsed:6.2f} s  пиковый RSS {peak:5.0f} MB")
+    with open(out, "wb") as f:
+        pickle.dump(proc, f)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--mode", help=argparse.SUPPRESS)
+    ap.add_argument("--path", help=argparse.SUPPRESS)
+    ap.add_argument("--cache", help=argparse.SUPPRESS)
+    ap.add_argument("--out", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.mode:
+        return run_mode(args.mode, args.path, args.cache, args.out)
+
+    import pandas as pd
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp); path = tmp / "price.xlsx"
+        t = time.perf_counter(); make_xlsx(path, args.rows)
+        print(f"{args.rows} строк, {path.stat().st_size / 2**20:.1f} MB, сгенерирован за {time.perf_counter() - t:.1f} s")
+        results = {}
+        for mode in ("read_excel", "stream", "cached"):
+            out = tmp / f"{mode}.pkl"
+            subprocess.run([sys.executable, __file__, "--mode", mode, "--path", str(path),
+                            "--cache", str(tmp / "cache"), "--out", str(out)], check=True)
+            with open(out, "rb") as f:
+                results[mode] = pickle.load(f)
+        for mode in ("stream", "cached"):
+            pd.testing.assert_frame_equal(results[mode], results["read_excel"], check_exact=True)
+        print("результаты совпадают")
+
+
+if __name__ == "__main__":
+    main()
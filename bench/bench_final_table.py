@@ -0,0 +1,89 @@
+# bench_final_table.py
+"""
+build_final_table на синтетической накладной (user-005):
+
+    python bench/bench_final_table.py [--lines N]
+
+Сравнивает прежнюю реализацию через iterrows (воспроизведена ниже, с поиском сопоставления
+на каждую строку) с текущей колоночной и проверяет, что итоговая таблица и price_updates совпадают.
+База создаётся во временной папке, database.db не трогается.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db
+from logic_export import build_final_table
+from logic_products import get_catalog
+
+PRODUCTS = 3000
+SUPPLIER_NAMES = 5000
+
+
+def build_final_table_iterrows(proc_df, supplier_id, product_mapping_fn, products_fn):
+    """Прежняя реализация: строка за строкой, агрегация в dict."""
+    df = proc_df.copy()
+    rows = []
+    for _, r in df.iterrows():
+        sname = str(r.get('name', '')).strip()
+        qty = float(r.get('qty', 0) or 0)
+        price = float(r.get('price', 0) or 0)
+        rows.append({'supplier_name': sname, 'qty': qty, 'price': price, 'my_id': product_mapping_fn(supplier_id, sname)})
+    agg = {}
+    for r in rows:
+        key = r['my_id'] if r['my_id'] is not None else ('__unmapped__:' + r['supplier_name'])
+        rec = agg.setdefault(key, {'qty': 0.0, 'cost': 0.0, 'names': []})
+        rec['qty'] += r['qty']; rec['cost'] += r['qty'] * r['price']; rec['names'].append(r['supplier_name'])
+    products = {p['id']: p for p in products_fn()}
+    final_rows, price_updates = [], []
+    for key, rec in agg.items():
+        if isinstance(key, int):
+            p = products.get(key)
+            name = p['my_name'] if p else ''; code = p['code'] if p and 'code' in p.keys() else ''
+        else:
+            name = rec['names'][0] if rec['names'] else ''; code = ''
+        avg_price = round((rec['cost'] / rec['qty']) if rec['qty'] > 0 else 0.0, 2)
+        if isinstance(key, int):
+            price_updates.append((key, avg_price))
+        final_rows.append({'Код': code, 'Наименование': name if name else key, 'Количество': rec['qty'], 'Закупочная цена': avg_price})
+    return pd.DataFrame(final_rows), price_updates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    db.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    db.init_db()
+    rng = random.Random(3)
+    with db.transaction() as cur:
+        cur.executemany("INSERT INTO my_products (my_name, code) VALUES (?, ?)",
+                        [(f"товар {i}", f"C{i}" if i % 3 else None) for i in range(PRODUCTS)])
+        cur.executemany("INSERT INTO product_mappings (supplier_id, supplier_name, my_product_id) VALUES (1, ?, ?)",
+                        [(f"поставщик {i}", i % PRODUCTS + 1) for i in range(0, SUPPLIER_NAMES, 2)])
+    db.touch_catalog()
+    n = args.lines
+    df = pd.DataFrame({'name': [f" поставщик {rng.randrange(SUPPLIER_NAMES)}" for _ in range(n)],
+                       'qty': [float(rng.randrange(1, 10)) for _ in range(n)],
+                       'price': [round(rng.uniform(1, 100), 2) for _ in range(n)], 'sum': 0.0})
+
+    t = time.perf_counter()
+    before = build_final_table_iterrows(df, 1, db.get_product_mapping, db.get_all_products)
+    t_before = time.perf_counter() - t
+    t = time.perf_counter()
+    after = build_final_table(df, 1, db.get_product_mappings_bulk, lambda: get_catalog().by_id)
+    t_after = time.perf_counter() - t
+    same = before[0].equals(after[0]) and before[1] == after[1]
+    print(f"{n:,} строк: iterrows {t_before:.2f} с, колоночно {t_after:.3f} с (x{t_before / t_after:.0f}); результат совпадает: {same}")
+    db.close_connection()
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
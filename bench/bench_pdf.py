@@ -0,0 +1,67 @@
+# bench_pdf.py
+"""
+Чтение многостраничной PDF-накладной: последовательно и в пуле процессов (user-007):
+
+    python bench/bench_pdf.py [--pages N] [--workers W]
+
+Генерирует во временной папке PDF из N страниц с таблицей на каждой (нужен reportlab — только
+для генерации) и сравнивает read_pdf_as_df(workers=1) с read_pdf_as_df(workers=W, по умолчанию
+число ядер). Проверяет, что таблицы и page_errors совпадают.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from logic_import import read_pdf_as_df
+
+ROWS_PER_PAGE = 40
+
+
+def make_pdf(path, pages, rows=ROWS_PER_PAGE):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import PageBreak, SimpleDocTemplate, Table, TableStyle
+    story = []
+    for p in range(pages):
+        data = [["Name", "Qty", "Price", "Sum"]] if p == 0 else []
+        data += [[f"item {p}-{r}", str(r % 7 + 1), f"{10 + r}.50", f"{(r % 7 + 1) * (10 + r)}"] for r in range(rows)]
+        table = Table(data)
+        table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black)]))
+        story += [table, PageBreak()]
+    SimpleDocTemplate(str(path), pagesize=A4).build(story)
+
+
+def timed(path, workers):
+    t = time.perf_counter()
+    df = read_pdf_as_df(path, workers=workers)
+    return df, time.perf_counter() - t
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=60)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "invoice.pdf"
+        make_pdf(path, args.pages)
+        serial, t_serial = timed(path, 1)
+        parallel, t_parallel = timed(path, args.workers)
+        print(f"{args.pages} страниц, {len(serial)} строк")
+        print(f"workers=1:  {t_serial:.2f} s")
+        print(f"workers={args.workers}:  {t_parallel:.2f} s  (x{t_serial / t_parallel:.2f}, {os.cpu_count()} ядер)")
+        pd.testing.assert_frame_equal(parallel, serial, check_exact=True)
+        assert parallel.attrs["page_errors"] == serial.attrs["page_errors"] == []
+        assert len(serial) == args.pages * ROWS_PER_PAGE
+        print("результаты совпадают")
+
+
+if __name__ == "__main__":
+    main()
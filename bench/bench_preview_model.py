@@ -0,0 +1,84 @@
+# bench_preview_model.py
+"""
+Прокрутка таблицы предпросмотра на 100k строк (user-009):
+
+    python bench/bench_preview_model.py [--rows N]
+
+Прокрутка имитируется чтением DisplayRole всех ячеек экранами по 30 строк (с fetchMore,
+когда модель его просит). Прежняя модель (iat + pd.isna + str на каждую ячейку) воспроизведена ниже.
+Также замеряется сортировка колонки и проверяется, что текст ячеек у обеих моделей одинаковый.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtWidgets import QApplication
+from pandas_model import PandasModel
+
+SCREEN = 30
+
+
+class EagerModel(QAbstractTableModel):
+    """Прежняя модель: форматирование ячейки при каждой отрисовке."""
+    def __init__(self, df):
+        super().__init__()
+        self._df = df.reset_index(drop=True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._df.index)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self._df.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            val = self._df.iat[index.row(), index.column()]
+            return "" if pd.isna(val) else str(val)
+        return None
+
+
+def scroll(model):
+    t = time.perf_counter(); row = 0; cols = model.columnCount()
+    while True:
+        while model.canFetchMore(QModelIndex()) and row + SCREEN > model.rowCount():
+            model.fetchMore(QModelIndex())
+        rows = model.rowCount()
+        if row >= rows:
+            return time.perf_counter() - t
+        for r in range(row, min(row + SCREEN, rows)):
+            for c in range(cols):
+                model.data(model.index(r, c), Qt.DisplayRole)
+        row += SCREEN
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    app = QApplication.instance() or QApplication(sys.argv)
+    n = args.rows; rng = np.random.default_rng(1)
+    df = pd.DataFrame({'Наименование': [f'товар {i}' for i in range(n)], 'Цена': rng.random(n) * 100,
+                       'шт': rng.integers(1, 10, n).astype(float), 'Сумма': np.where(np.arange(n) % 10 == 0, np.nan, 1.0)})
+
+    old = EagerModel(df)
+    print(f"прежняя модель: прокрутка {scroll(old):.2f} с")
+    t = time.perf_counter(); new = PandasModel(df); t_init = time.perf_counter() - t
+    print(f"PandasModel: создание {t_init * 1000:.0f} мс, прокрутка {scroll(new):.2f} с, повторно {scroll(new):.2f} с")
+    t = time.perf_counter(); new.sort(1, Qt.DescendingOrder)
+    print(f"сортировка по цене {(time.perf_counter() - t) * 1000:.0f} мс")
+    fresh = PandasModel(df)
+    same = all(old.data(old.index(r, c)) == fresh.data(fresh.index(r, c)) for r in range(0, min(n, 1000)) for c in range(4))
+    print(f"текст ячеек совпадает: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
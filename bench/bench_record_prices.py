@@ -0,0 +1,76 @@
+# bench_record_prices.py
+"""
+Запись 5k новых закупочных цен (user-015):
+
+    python bench/bench_record_prices.py [--products N]
+
+«До» — как раньше в generate_final: на каждый товар читается вся история цен, изменившаяся цена
+добавляется отдельной записью, last_price обновляется отдельным запросом (воспроизведено ниже).
+«После» — logic_price.record_prices одним пакетом. У каждого товара 20 записей истории;
+примерно треть цен не меняется. Проверяется, что итоговые my_products и price_history совпадают.
+"""
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db
+from logic_price import record_prices
+
+HISTORY = 20
+
+
+def build(path, n):
+    db.close_connection()
+    db.DB_PATH = path
+    db.init_db()
+    with db.transaction() as cur:
+        cur.executemany("INSERT INTO my_products (my_name, last_price) VALUES (?, ?)", [(f"товар {i}", 10.0) for i in range(n)])
+        cur.executemany("INSERT INTO price_history (product_id, price) VALUES (?, ?)",
+                        [(i + 1, 10.0) for i in range(n) for _ in range(HISTORY)])
+    rng = random.Random(3)
+    return [(i + 1, rng.choice([10.0, 11.5, 9.99])) for i in range(n)]
+
+
+def record_per_product(price_updates):
+    """Прежний путь: чтение истории и запись по одному товару."""
+    with db.transaction() as cur:
+        for pid, price in price_updates:
+            history = db.get_price_history_for_product(pid)
+            last_price = history[0]['price'] if history else None
+            if last_price is None or float(price) != float(last_price):
+                db.add_price_history(pid, price)
+            cur.execute("UPDATE my_products SET last_price = ? WHERE id = ?", (price, pid))
+
+
+def state():
+    conn = db.connection()
+    return ([tuple(r) for r in conn.execute("SELECT id, last_price FROM my_products ORDER BY id")],
+            [tuple(r) for r in conn.execute("SELECT product_id, price FROM price_history ORDER BY id")])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)  # add_price_history пишет в лог каждую запись
+    tmp = Path(tempfile.mkdtemp())
+
+    updates = build(tmp / "before.db", args.products)
+    t = time.perf_counter(); record_per_product(updates); t_before = time.perf_counter() - t
+    before = state()
+    updates = build(tmp / "after.db", args.products)
+    t = time.perf_counter(); changed = record_prices(updates); t_after = time.perf_counter() - t
+    same = state() == before
+    print(f"{len(updates):,} цен ({changed:,} изменились): по одному товару {t_before:.2f} с, "
+          f"record_prices {t_after * 1000:.0f} мс; результат совпадает: {same}")
+    db.close_connection()
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
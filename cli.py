@@ -0,0 +1,161 @@
+# cli.py
+"""
+Пакетная обработка накладных без GUI (PySide6 не импортируется — быстро стартует на сервере):
+
+    python cli.py process ПАПКА [--supplier ID] [--out ПАПКА] [--workers N] [--force] [--db ФАЙЛ]
+
+Каждый файл разбирается так же, как "Открыть Excel/PDF" + "Сформировать итоговый Excel":
+read_supplier_head → resolve_mapping (сохранённое сопоставление колонок или ключевые слова) →
+prepare_supplier_file (.xlsx — порциями) → build_final_table.
+Файлы обрабатываются в пуле процессов, на каждый пишется <имя>_itog.xlsx, плюс summary_<время>.xlsx.
+Файлы, уже обработанные для этого поставщика (хэш содержимого в supplier_file_history), пропускаются.
+Без --supplier поставщик каждого файла определяется по шаблонам suppliers.pattern (logic_suppliers);
+файлы, для которых он не определён уверенно, пропускаются с пометкой в сводке.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import db
+from db import init_db, get_supplier, get_suppliers, get_product_mappings_bulk, add_supplier_file_history, get_processed_file_hashes
+from logic_import import read_supplier_head, prepare_supplier_file, file_digest
+from logic_mapping import resolve_mapping
+from logic_suppliers import detect_supplier, confident_supplier
+from logic_export import build_final_table, save_to_excel
+from logic_price import record_prices
+from logic_products import get_catalog
+
+SUPPORTED = (".xlsx", ".xls", ".pdf")
+
+
+def _init_worker(db_path):
+    db.DB_PATH = Path(db_path)
+
+
+def process_file(path, supplier_id, out_dir):
+    """
+    Один файл в рабочем процессе. База только читается (сопоставления, каталог, шаблоны поставщиков);
+    цены и историю файлов записывает родительский процесс. supplier_id=None — определить по файлу.
+    """
+    path = Path(path)
+    res = {'file': path.name, 'status': 'готово', 'rows': 0, 'items': 0, 'mapped': 0, 'output': '', 'error': '',
+           'columns': [], 'price_updates': [], 'page_errors': [], 'supplier_id': supplier_id}
+    try:
+        df = read_supplier_head(path, pdf_workers=1)  # процессов и так по числу ядер
+        df.columns = [str(c).strip() for c in df.columns]
+        if supplier_id is None:
+            guesses = detect_supplier(path, df)
+            supplier_id = res['supplier_id'] = confident_supplier(guesses)
+            if supplier_id is None:
+                best = f" (лучшее совпадение: id={guesses[0][0]}, {guesses[0][1]:.0%})" if guesses else ""
+                res.update(status='пропущен', error="поставщик не определён" + best)
+                return res
+        mapping, _ = resolve_mapping(df, supplier_id)
+        proc = prepare_supplier_file(path, mapping, head=df, pdf_workers=1)
+        df_final, price_updates = build_final_table(proc, supplier_id, get_product_mappings_bulk, lambda: get_catalog().by_id)
+        out = Path(out_dir) / f"{path.stem}_itog.xlsx"
+        save_to_excel(df_final, out)
+        res.update(rows=len(proc), items=len(df_final), mapped=len(price_updates), output=str(out),
+                   columns=list(df.columns), price_updates=price_updates, page_errors=df.attrs.get('page_errors') or [])
+    except Exception as e:
+        logging.exception("CLI: ошибка обработки %s", path)
+        res.update(status='ошибка', error=f"{type(e).__name__}: {e}")
+    return res
+
+
+def list_supplier_files(folder, out_dir):
+    skip_outputs = Path(out_dir).resolve() == Path(folder).resolve()
+    files = []
+    for p in sorted(Path(folder).iterdir()):
+        if not p.is_file() or p.suffix.lower() not in SUPPORTED or p.name.startswith("~$"):
+            continue
+        if skip_outputs and (p.stem.endswith("_itog") or p.stem.startswith("summary_")):
+            continue
+        files.append(p)
+    return files
+
+
+def cmd_process(args):
+    folder = Path(args.folder)
+    if not folder.is_dir():
+        print(f"Папка не найдена: {folder}", file=sys.stderr); return 2
+    if args.supplier is not None and get_supplier(args.supplier) is None:
+        print(f"Поставщик id={args.supplier} не найден", file=sys.stderr); return 2
+    out_dir = Path(args.out) if args.out else folder / "itog"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    done = set() if args.force else get_processed_file_hashes(args.supplier)  # без --supplier — по всем поставщикам
+    todo, summary, seen = [], [], {}
+    for p in list_supplier_files(folder, out_dir):
+        digest = file_digest(p)
+        if digest in done:
+            summary.append({'file': p.name, 'status': 'пропущен', 'error': 'уже обработан'})
+        elif digest in seen:  # одинаковые файлы в папке — обрабатываем один раз
+            summary.append({'file': p.name, 'status': 'пропущен', 'error': f"совпадает с {seen[digest]}"})
+        else:
+            todo.append((p, digest)); seen[digest] = p.name
+    print(f"Файлов к обработке: {len(todo)}, пропущено: {len(summary)}")
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(todo) or 1))
+    paths = [p for p, _ in todo]
+    if workers == 1:
+        results = (process_file(p, args.supplier, out_dir) for p in paths)
+        ex = None
+    else:
+        # spawn и на Linux: открытое соединение SQLite не должно попадать в дочерние процессы через fork
+        ex = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(str(db.DB_PATH),))
+        results = ex.map(process_file, paths, [args.supplier] * len(paths), [out_dir] * len(paths))
+    try:
+        # результаты приходят в порядке файлов: цены более поздних файлов перекрывают ранние, как при ручной работе
+        for (p, digest), res in zip(todo, results):
+            if res['status'] == 'готово':
+                res['prices_changed'] = record_prices(res['price_updates'])
+                add_supplier_file_history(res['supplier_id'], p.name, res['columns'], file_hash=digest)
+                if res['page_errors']:
+                    res['error'] = "не прочитаны страницы: " + ", ".join(str(n) for n, _ in res['page_errors'])
+            print(f"{res['status']:>8}  {p.name}  {res['error'] or res['output']}")
+            summary.append(res)
+    finally:
+        if ex is not None:
+            ex.shutdown()
+
+    summary.sort(key=lambda r: r['file'])
+    names = {s['id']: s['name'] for s in get_suppliers()}
+    report = pd.DataFrame([{
+        'Файл': r['file'], 'Статус': r['status'], 'Поставщик': names.get(r.get('supplier_id'), ''),
+        'Строк': r.get('rows', 0), 'Позиций': r.get('items', 0),
+        'Сопоставлено': r.get('mapped', 0), 'Изменено цен': r.get('prices_changed', 0),
+        'Итоговый файл': r.get('output', ''), 'Примечание': r.get('error', ''),
+    } for r in summary])
+    summary_path = out_dir / f"summary_{datetime.now():%Y%m%d%H%M%S}.xlsx"
+    save_to_excel(report, summary_path)
+    print(f"Сводка: {summary_path}")
+    return 1 if any(r['status'] == 'ошибка' for r in summary) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обработка накладных поставщиков без GUI")
+    parser.add_argument("--db", help="путь к базе (по умолчанию database.db рядом с программой)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("process", help="обработать все файлы поставщика в папке")
+    p.add_argument("folder", help="папка с файлами .xlsx / .xls / .pdf")
+    p.add_argument("--supplier", type=int, help="id поставщика (по умолчанию — определить по шаблонам поставщиков)")
+    p.add_argument("--out", help="куда писать результаты (по умолчанию ПАПКА/itog)")
+    p.add_argument("--workers", type=int, help="число процессов (по умолчанию — число ядер)")
+    p.add_argument("--force", action="store_true", help="обработать и уже обработанные файлы")
+    p.set_defaults(func=cmd_process)
+    args = parser.parse_args(argv)
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
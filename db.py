@@ -1,9 +1,12 @@
 # db.py
 import sqlite3
+import json
 from pathlib import Path
-import shutil
-from datetime import datetime
+import threading
+import itertools
+from contextlib import contextmanager
 import logging
+from text_utils import normalize_name, header_fingerprint
 
 BASE = Path(__file__).parent
 DB_PATH = BASE / "database.db"
@@ -13,32 +16,95 @@ LOG_DIR.mkdir(exist_ok=True)
 logging.basicConfig(filename=str(LOG_DIR/"app.log"), level=logging.INFO,
                     format='%(asctime)s %(levelname)s:%(message)s')
 
+# бэкап этого запуска уже снят (перед миграциями в init_db) — отложенный бэкап при старте не нужен
+_startup_backup_done = False
+
 def rotate_backups():
-    """Ротация бэкапов: сохраняем копии database.db и оставляем максимум 3."""
+    """
+    Ротация бэкапов: онлайн-копия database.db (backup.create_backup — SQLite backup API порциями страниц,
+    можно делать на работающей базе) и удаление старых по политике хранения backup.apply_retention.
+    Возвращает True, если бэкап создан.
+    """
     try:
-        BACKUP_DIR.mkdir(exist_ok=True)
         if DB_PATH.exists():
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            dest = BACKUP_DIR / f"db_{timestamp}.sqlite"
-            shutil.copy2(DB_PATH, dest)
-            # удалить старые, оставить 3 последние
-            files = sorted(BACKUP_DIR.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
-            for f in files[3:]:
-                try:
-                    f.unlink()
-                except Exception:
-                    logging.exception("Не удалось удалить старый бэкап %s", f)
+            import backup  # backup.py сам импортирует db
+            backup.create_backup()
+            backup.apply_retention()
+            return True
     except Exception:
         logging.exception("rotate_backups failed")
+    return False
+
+def startup_backup_needed():
+    return not _startup_backup_done
+
+# -------------------------
+# persistent per-thread connection
+# -------------------------
+_local = threading.local()
+
+# счётчик изменений my_products: кэш каталога (logic_products.get_catalog) перечитывается, когда он меняется
+_catalog_counter = itertools.count(1)
+_catalog_version = 0
+
+def catalog_version():
+    return _catalog_version
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def touch_catalog():
+    """Отметить изменение my_products (вызывать после записи в таблицу в обход helper-функций)."""
+    global _catalog_version
+    _catalog_version = next(_catalog_counter)
+
+def connection():
+    """Долгоживущее соединение текущего потока (WAL, настроенные pragma). Не закрывать вручную."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")
+        conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+        _local.conn = conn; _local.depth = 0
     return conn
 
+def close_connection():
+    """Закрыть соединение текущего потока (например, при завершении рабочего потока)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """
+    Группирует записи в одну транзакцию:
+        with transaction() as cur: ...
+    Вложенные блоки (в т.ч. внутри helper-функций) не коммитят — коммит делает только внешний.
+    """
+    conn = connection()
+    outer = _local.depth == 0
+    if outer and not conn.in_transaction:
+        conn.execute("BEGIN")  # явно: иначе sqlite3 не открывает транзакцию для DDL (миграции)
+    _local.depth += 1
+    try:
+        yield conn.cursor()
+    except BaseException:
+        _local.depth -= 1
+        if outer:
+            conn.rollback()
+            touch_catalog()  # кэш мог прочитать откатанные строки
+        raise
+    else:
+        _local.depth -= 1
+        if outer:
+            conn.commit()
+
 def init_db():
-    conn = get_connection()
+    conn = connection()
     cur = conn.cursor()
+    existing = cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'my_products'").fetchone() is not None
 
     # my_products
     cur.execute("""
@@ -108,141 +174,408 @@ def init_db():
     """)
 
     conn.commit()
-    conn.close()
+    migrate(backup=existing)
+
+# -------------------------
+# schema migrations (PRAGMA user_version)
+# -------------------------
+def _migration_1_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_price_history_product_date ON price_history(product_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_mappings_supplier_column ON supplier_mappings(supplier_id, file_column)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_my_products_code ON my_products(code)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_product_mappings_my_product ON product_mappings(my_product_id)")
+
+def _migration_2_norm_name(cur):
+    cur.execute("ALTER TABLE my_products ADD COLUMN norm_name TEXT")
+    cur.execute("SELECT id, my_name FROM my_products")
+    cur.executemany("UPDATE my_products SET norm_name = ? WHERE id = ?",
+                    [(normalize_name(r["my_name"]), r["id"]) for r in cur.fetchall()])
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_my_products_norm_name ON my_products(norm_name)")
+
+def _migration_3_price_rollups(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS price_rollups (
+            product_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            min_price REAL NOT NULL,
+            max_price REAL NOT NULL,
+            sum_price REAL NOT NULL,
+            last_price REAL NOT NULL,
+            last_date TEXT,
+            PRIMARY KEY (product_id, period, bucket)
+        ) WITHOUT ROWID
+    """)
+    rollup_prices(cur)
+
+def _migration_4_file_hash(cur):
+    cur.execute("ALTER TABLE supplier_file_history ADD COLUMN file_hash TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_file_history_hash ON supplier_file_history(supplier_id, file_hash)")
+
+def _migration_5_header_hash(cur):
+    cur.execute("ALTER TABLE supplier_file_history ADD COLUMN header_hash TEXT")
+    cur.execute("SELECT id, columns_text FROM supplier_file_history WHERE columns_text IS NOT NULL")
+    cur.executemany("UPDATE supplier_file_history SET header_hash = ? WHERE id = ?",
+                    [(header_fingerprint(r["columns_text"].split("||")), r["id"]) for r in cur.fetchall()])
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_file_history_header ON supplier_file_history(supplier_id, header_hash)")
+
+def _migration_6_match_candidates(cur):
+    # постоянная ревизия каталога: растёт при каждом добавлении, переименовании и удалении товара,
+    # изменённая строка my_products помечается новой ревизией (см. changed_product_ids)
+    cur.execute("CREATE TABLE IF NOT EXISTS catalog_revision (id INTEGER PRIMARY KEY CHECK (id = 1), revision INTEGER NOT NULL)")
+    cur.execute("INSERT OR IGNORE INTO catalog_revision (id, revision) VALUES (1, 0)")
+    cur.execute("ALTER TABLE my_products ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_my_products_revision ON my_products(revision)")
+    for event in ("INSERT", "UPDATE OF my_name"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS my_products_revision_{event.split()[0].lower()} AFTER {event} ON my_products BEGIN
+                UPDATE catalog_revision SET revision = revision + 1;
+                UPDATE my_products SET revision = (SELECT revision FROM catalog_revision) WHERE id = NEW.id;
+            END
+        """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS my_products_revision_delete AFTER DELETE ON my_products BEGIN
+            UPDATE catalog_revision SET revision = revision + 1;
+        END
+    """)
+    # top-k кандидатов каталога для строки поставщика: candidates — JSON [[my_product_id, score], ...]
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS match_candidates (
+            supplier_id INTEGER NOT NULL,
+            supplier_name TEXT NOT NULL,
+            catalog_revision INTEGER NOT NULL,
+            candidates TEXT NOT NULL,
+            PRIMARY KEY (supplier_id, supplier_name)
+        ) WITHOUT ROWID
+    """)
+
+def _migration_7_header_mappings(cur):
+    # сопоставление колонок запоминается для конкретного заголовка файла (header_fingerprint);
+    # прежние строки без header_hash — общие для поставщика, при разборе файлов не применяются
+    cur.execute("ALTER TABLE supplier_mappings ADD COLUMN header_hash TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_mappings_header ON supplier_mappings(supplier_id, header_hash)")
+
+def _migration_8_drop_history_header_hash(cur):
+    # заголовок ищется в supplier_mappings.header_hash (миграция 7); копия в истории файлов больше не читается
+    cur.execute("DROP INDEX IF EXISTS idx_supplier_file_history_header")
+    cur.execute("ALTER TABLE supplier_file_history DROP COLUMN header_hash")
+
+# (версия, функция) — только добавлять в конец, уже выпущенные не менять
+MIGRATIONS = [
+    (1, _migration_1_indexes),
+    (2, _migration_2_norm_name),
+    (3, _migration_3_price_rollups),
+    (4, _migration_4_file_hash),
+    (5, _migration_5_header_hash),
+    (6, _migration_6_match_candidates),
+    (7, _migration_7_header_mappings),
+    (8, _migration_8_drop_history_header_hash),
+]
+
+def migrate(backup=True):
+    """
+    Применяет недостающие миграции, каждую в своей транзакции вместе с PRAGMA user_version.
+    backup=True: если есть что применять — сначала синхронный бэкап (rotate_backups), как и раньше
+    перед любыми изменениями; новой пустой базе он не нужен.
+    """
+    global _startup_backup_done
+    conn = connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if backup and version < MIGRATIONS[-1][0] and not _startup_backup_done:
+        _startup_backup_done = rotate_backups()
+    for target, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        with transaction() as cur:
+            fn(cur)
+            cur.execute(f"PRAGMA user_version = {target}")
+        logging.info("Схема БД обновлена до версии %s (%s)", target, fn.__name__)
+        version = target
+    touch_catalog()
+    for sql, detail in full_scans():
+        logging.warning("Запрос без индекса: %s -> %s", sql, detail)
+
+# запросы на горячих путях: каждый должен идти по индексу (см. full_scans)
+HOT_QUERIES = [
+    ("SELECT date, price FROM price_history WHERE product_id = ? ORDER BY date DESC", (1,)),
+    ("SELECT bucket FROM price_rollups WHERE product_id = ? AND period = ? ORDER BY bucket", (1, "month")),
+    ("SELECT file_hash FROM supplier_file_history WHERE supplier_id = ? AND file_hash IS NOT NULL", (1,)),
+    ("SELECT file_column, logical_column FROM supplier_mappings WHERE supplier_id = ? AND header_hash = ?", (1, "")),
+    ("SELECT id FROM supplier_mappings WHERE supplier_id = ? AND file_column = ?", (1, "")),
+    ("SELECT id FROM my_products WHERE code = ?", ("",)),
+    ("SELECT id FROM my_products WHERE norm_name = ?", ("",)),
+    ("SELECT id FROM my_products WHERE revision > ?", (0,)),
+    ("SELECT candidates FROM match_candidates WHERE supplier_id = ? AND supplier_name IN (SELECT value FROM json_each(?))", (1, "[]")),
+    ("UPDATE product_mappings SET my_product_id = ? WHERE my_product_id = ?", (1, 1)),
+    ("SELECT my_product_id FROM product_mappings WHERE supplier_id = ? AND supplier_name = ?", (1, "")),
+]
+
+def full_scans():
+    """[(sql, detail)] для горячих запросов, план которых содержит полный просмотр таблицы или временную сортировку."""
+    cur = connection().cursor()
+    bad = []
+    for sql, params in HOT_QUERIES:
+        for row in cur.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall():
+            detail = row["detail"]
+            if (detail.startswith("SCAN") and "INDEX" not in detail) or "TEMP B-TREE" in detail:
+                bad.append((sql, detail))
+    return bad
 
 # -------------------------
 # my_products helpers
 # -------------------------
 def add_my_product(name, category="", code=None, last_price=None):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("INSERT INTO my_products (my_name, category, code, last_price) VALUES (?, ?, ?, ?)",
-                (name, category, code, last_price))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("INSERT INTO my_products (my_name, category, code, last_price, norm_name) VALUES (?, ?, ?, ?, ?)",
+                    (name, category, code, last_price, normalize_name(name)))
+    touch_catalog()
     logging.info("Добавлен товар: %s (code=%s)", name, code)
 
 def update_my_product(pid, name=None, code=None, last_price=None):
-    conn = get_connection(); cur = conn.cursor()
-    if name is not None:
-        cur.execute("UPDATE my_products SET my_name = ? WHERE id = ?", (name, pid))
-    if code is not None:
-        cur.execute("UPDATE my_products SET code = ? WHERE id = ?", (code, pid))
-    if last_price is not None:
-        cur.execute("UPDATE my_products SET last_price = ? WHERE id = ?", (last_price, pid))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        if name is not None:
+            cur.execute("UPDATE my_products SET my_name = ?, norm_name = ? WHERE id = ?", (name, normalize_name(name), pid))
+        if code is not None:
+            cur.execute("UPDATE my_products SET code = ? WHERE id = ?", (code, pid))
+        if last_price is not None:
+            cur.execute("UPDATE my_products SET last_price = ? WHERE id = ?", (last_price, pid))
+    touch_catalog()
     logging.info("Обновлён товар id=%s name=%s code=%s price=%s", pid, name, code, last_price)
 
 def delete_my_product(product_id):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("DELETE FROM my_products WHERE id = ?", (product_id,))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("DELETE FROM my_products WHERE id = ?", (product_id,))
+    touch_catalog()
     logging.info("Удалён товар id=%s", product_id)
 
 def get_all_products():
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT * FROM my_products ORDER BY my_name ASC")
-    rows = cur.fetchall(); conn.close()
+    rows = cur.fetchall()
     return rows
 
 # -------------------------
 # suppliers helpers
 # -------------------------
 def add_supplier(name, pattern=None):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("INSERT INTO suppliers (name, pattern) VALUES (?, ?)", (name, pattern))
-    conn.commit(); sid = cur.lastrowid; conn.close()
+    with transaction() as cur:
+        cur.execute("INSERT INTO suppliers (name, pattern) VALUES (?, ?)", (name, pattern))
+        sid = cur.lastrowid
     logging.info("Добавлен поставщик: %s (id=%s)", name, sid)
     return sid
 
 def get_suppliers():
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT * FROM suppliers ORDER BY name")
-    rows = cur.fetchall(); conn.close()
+    rows = cur.fetchall()
     return rows
 
 def get_supplier(supplier_id):
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT * FROM suppliers WHERE id = ?", (supplier_id,))
-    row = cur.fetchone(); conn.close()
+    row = cur.fetchone()
     return row
 
+def set_supplier_pattern(supplier_id, pattern):
+    """Шаблоны для определения поставщика по файлу (logic_suppliers), по одному в строке."""
+    with transaction() as cur:
+        cur.execute("UPDATE suppliers SET pattern = ? WHERE id = ?", (pattern or None, supplier_id))
+    logging.info("Шаблоны поставщика %s изменены", supplier_id)
+
 def rename_supplier(supplier_id, new_name):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("UPDATE suppliers SET name = ? WHERE id = ?", (new_name, supplier_id))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("UPDATE suppliers SET name = ? WHERE id = ?", (new_name, supplier_id))
     logging.info("Поставщик %s переименован в %s", supplier_id, new_name)
 
 def delete_supplier(supplier_id):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
     logging.info("Поставщик %s удалён", supplier_id)
 
 # -------------------------
 # supplier_mappings (columns)
 # -------------------------
 def save_mapping(supplier_id, file_column, logical_column):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT id FROM supplier_mappings WHERE supplier_id = ? AND file_column = ?", (supplier_id, file_column))
-    if cur.fetchone():
-        cur.execute("UPDATE supplier_mappings SET logical_column = ? WHERE supplier_id = ? AND file_column = ?",
-                    (logical_column, supplier_id, file_column))
-    else:
-        cur.execute("INSERT INTO supplier_mappings (supplier_id, file_column, logical_column) VALUES (?, ?, ?)",
-                    (supplier_id, file_column, logical_column))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("SELECT id FROM supplier_mappings WHERE supplier_id = ? AND file_column = ?", (supplier_id, file_column))
+        if cur.fetchone():
+            cur.execute("UPDATE supplier_mappings SET logical_column = ? WHERE supplier_id = ? AND file_column = ?",
+                        (logical_column, supplier_id, file_column))
+        else:
+            cur.execute("INSERT INTO supplier_mappings (supplier_id, file_column, logical_column) VALUES (?, ?, ?)",
+                        (supplier_id, file_column, logical_column))
     logging.info("Сохранён mapping: supplier=%s, file_col=%s -> %s", supplier_id, file_column, logical_column)
 
 def get_mappings_for_supplier(supplier_id):
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT file_column, logical_column FROM supplier_mappings WHERE supplier_id = ?", (supplier_id,))
-    rows = cur.fetchall(); conn.close()
+    rows = cur.fetchall()
     return {r["file_column"]: r["logical_column"] for r in rows}
 
-def add_supplier_file_history(supplier_id, filename, columns):
-    conn = get_connection(); cur = conn.cursor()
+def save_header_mapping(supplier_id, header_hash, mapping):
+    """
+    Сопоставление колонок файла с заголовком header_hash (header_fingerprint) целиком: {file_column: logical_column или None}.
+    Прежнее сопоставление этого заголовка заменяется; колонки с None не сохраняются (значит — «не использовать»).
+    """
+    with transaction() as cur:
+        cur.execute("DELETE FROM supplier_mappings WHERE supplier_id = ? AND header_hash = ?", (supplier_id, header_hash))
+        cur.executemany("INSERT INTO supplier_mappings (supplier_id, file_column, logical_column, header_hash) VALUES (?, ?, ?, ?)",
+                        [(supplier_id, c, logical, header_hash) for c, logical in mapping.items() if logical])
+    logging.info("Сохранён mapping поставщика %s для заголовка %s: %s", supplier_id, header_hash, {c: l for c, l in mapping.items() if l})
+
+def get_header_mapping(supplier_id, header_hash):
+    """{file_column: logical_column}, сохранённое save_header_mapping; пустой dict — заголовок не запоминался."""
+    cur = connection().cursor()
+    cur.execute("SELECT file_column, logical_column FROM supplier_mappings WHERE supplier_id = ? AND header_hash = ?",
+                (supplier_id, header_hash))
+    return {r["file_column"]: r["logical_column"] for r in cur.fetchall()}
+
+def add_supplier_file_history(supplier_id, filename, columns, file_hash=None):
     cols_text = "||".join(columns)
-    cur.execute("INSERT INTO supplier_file_history (supplier_id, filename, columns_text) VALUES (?, ?, ?)",
-                (supplier_id, filename, cols_text))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("INSERT INTO supplier_file_history (supplier_id, filename, columns_text, file_hash) VALUES (?, ?, ?, ?)",
+                    (supplier_id, filename, cols_text, file_hash))
     logging.info("Добавлена запись истории файла поставщика %s -> %s", supplier_id, filename)
 
+def get_processed_file_hashes(supplier_id=None):
+    """Хэши содержимого уже обработанных файлов поставщика (None — всех поставщиков); file_hash пишет cli.py."""
+    cur = connection().cursor()
+    if supplier_id is None:
+        cur.execute("SELECT file_hash FROM supplier_file_history WHERE file_hash IS NOT NULL")
+    else:
+        cur.execute("SELECT file_hash FROM supplier_file_history WHERE supplier_id = ? AND file_hash IS NOT NULL", (supplier_id,))
+    return {r["file_hash"] for r in cur.fetchall()}
+
 # -------------------------
 # product mappings (supplier_name -> my_product_id)
 # -------------------------
 def get_product_mapping(supplier_id, supplier_name):
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT my_product_id FROM product_mappings WHERE supplier_id = ? AND supplier_name = ?", (supplier_id, supplier_name))
-    row = cur.fetchone(); conn.close()
+    row = cur.fetchone()
     return row["my_product_id"] if row else None
 
+def get_product_mappings_bulk(supplier_id, supplier_names):
+    """{supplier_name: my_product_id} для набора имён одним запросом (имена передаются JSON-массивом)."""
+    names = list(dict.fromkeys(str(n) for n in supplier_names))
+    if not names:
+        return {}
+    cur = connection().cursor()
+    cur.execute("SELECT supplier_name, my_product_id FROM product_mappings "
+                "WHERE supplier_id = ? AND supplier_name IN (SELECT value FROM json_each(?))",
+                (supplier_id, json.dumps(names, ensure_ascii=False)))
+    return {r["supplier_name"]: r["my_product_id"] for r in cur.fetchall()}
+
 def save_product_mapping(supplier_id, supplier_name, my_product_id):
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("INSERT INTO product_mappings (supplier_id, supplier_name, my_product_id) VALUES (?, ?, ?) "
-                "ON CONFLICT(supplier_id, supplier_name) DO UPDATE SET my_product_id = excluded.my_product_id",
-                (supplier_id, supplier_name, my_product_id))
-    conn.commit(); conn.close()
+    with transaction() as cur:
+        cur.execute("INSERT INTO product_mappings (supplier_id, supplier_name, my_product_id) VALUES (?, ?, ?) "
+                    "ON CONFLICT(supplier_id, supplier_name) DO UPDATE SET my_product_id = excluded.my_product_id",
+                    (supplier_id, supplier_name, my_product_id))
     logging.info("Сохранено сопоставление %s -> %s (supplier %s)", supplier_name, my_product_id, supplier_id)
 
 def get_all_product_mappings_for_supplier(supplier_id):
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT supplier_name, my_product_id FROM product_mappings WHERE supplier_id = ? ORDER BY supplier_name", (supplier_id,))
-    rows = cur.fetchall(); conn.close()
+    rows = cur.fetchall()
     return {r["supplier_name"]: r["my_product_id"] for r in rows}
 
+# -------------------------
+# match_candidates: сохранённые кандидаты сопоставления (logic_matching.refresh_match_candidates)
+# -------------------------
+def catalog_revision():
+    """Постоянная ревизия my_products (в отличие от catalog_version переживает перезапуск)."""
+    return connection().execute("SELECT revision FROM catalog_revision").fetchone()[0]
+
+def changed_product_ids(since_revision):
+    """id товаров, добавленных или переименованных после ревизии since_revision."""
+    cur = connection().cursor()
+    cur.execute("SELECT id FROM my_products WHERE revision > ?", (since_revision,))
+    return {r["id"] for r in cur.fetchall()}
+
+def get_match_candidates(supplier_id, supplier_names):
+    """{supplier_name: (catalog_revision, [(my_product_id, score), ...])} для набора имён."""
+    names = list(dict.fromkeys(str(n) for n in supplier_names))
+    if not names:
+        return {}
+    cur = connection().cursor()
+    cur.execute("SELECT supplier_name, catalog_revision, candidates FROM match_candidates "
+                "WHERE supplier_id = ? AND supplier_name IN (SELECT value FROM json_each(?))",
+                (supplier_id, json.dumps(names, ensure_ascii=False)))
+    return {r["supplier_name"]: (r["catalog_revision"], [tuple(c) for c in json.loads(r["candidates"])])
+            for r in cur.fetchall()}
+
+def save_match_candidates(supplier_id, revision, candidates):
+    """candidates: {supplier_name: [(my_product_id, score), ...]}, посчитанные по каталогу ревизии revision."""
+    with transaction() as cur:
+        cur.executemany("INSERT INTO match_candidates (supplier_id, supplier_name, catalog_revision, candidates) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(supplier_id, supplier_name) DO UPDATE SET "
+                        "catalog_revision = excluded.catalog_revision, candidates = excluded.candidates",
+                        [(supplier_id, name, revision, json.dumps(c)) for name, c in candidates.items()])
+
 # -------------------------
 # price history
 # -------------------------
 def add_price_history(product_id, price, date=None):
-    conn = get_connection(); cur = conn.cursor()
-    if date:
-        cur.execute("INSERT INTO price_history (product_id, date, price) VALUES (?, ?, ?)", (product_id, date, price))
-    else:
-        cur.execute("INSERT INTO price_history (product_id, price) VALUES (?, ?)", (product_id, price))
-    conn.commit(); conn.close()
+    """Одна запись цены (с агрегатом). Пакеты цен пишет logic_price.record_prices — агрегаты там обновляются раз на пакет."""
+    with transaction() as cur:
+        if date:
+            cur.execute("INSERT INTO price_history (product_id, date, price) VALUES (?, ?, ?)", (product_id, date, price))
+        else:
+            cur.execute("INSERT INTO price_history (product_id, price) VALUES (?, ?)", (product_id, price))
+        rollup_prices(cur, "id = ?", (cur.lastrowid,))
     logging.info("Добавлена запись цены product_id=%s price=%s", product_id, price)
 
 def get_price_history_for_product(product_id):
-    conn = get_connection(); cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT date, price FROM price_history WHERE product_id = ? ORDER BY date DESC", (product_id,))
-    rows = cur.fetchall(); conn.close()
+    rows = cur.fetchall()
     return [dict(r) for r in rows]
+
+# -------------------------
+# price_rollups: агрегаты истории цен по дням / неделям / месяцам
+# -------------------------
+ROLLUP_PERIODS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+_ROLLUP_UPSERT = """
+    INSERT INTO price_rollups (product_id, period, bucket, n, min_price, max_price, sum_price, last_price, last_date)
+    SELECT h.product_id, p.period, COALESCE(strftime(p.fmt, h.date), h.date, ''), 1, h.price, h.price, h.price, h.price, h.date
+    FROM (SELECT id, product_id, date, price FROM price_history WHERE {where}) AS h
+    CROSS JOIN ({periods}) AS p
+    WHERE 1 ORDER BY h.id
+    ON CONFLICT (product_id, period, bucket) DO UPDATE SET
+        n = n + 1,
+        min_price = MIN(min_price, excluded.min_price),
+        max_price = MAX(max_price, excluded.max_price),
+        sum_price = sum_price + excluded.sum_price,
+        last_price = CASE WHEN excluded.last_date >= last_date THEN excluded.last_price ELSE last_price END,
+        last_date = MAX(last_date, excluded.last_date)
+""".replace("{periods}", " UNION ALL ".join(
+    f"SELECT '{period}' AS period, '{fmt}' AS fmt" for period, fmt in ROLLUP_PERIODS.items()))
+
+def rollup_prices(cur, where="1", params=()):
+    """Добавляет строки price_history, подходящие под where, в price_rollups (внутри транзакции вызывающего)."""
+    cur.execute(_ROLLUP_UPSERT.format(where=where), params)
+
+def rebuild_price_rollups(cur, where, params=()):
+    """Пересчитывает агрегаты товаров, подходящих под where (условие на product_id), с нуля."""
+    cur.execute(f"DELETE FROM price_rollups WHERE {where}", params)
+    rollup_prices(cur, where, params)
+
+def get_price_rollups(product_id, period="month"):
+    cur = connection().cursor()
+    cur.execute("""SELECT bucket, n, min_price, max_price, sum_price / n AS avg_price, last_price, last_date
+                   FROM price_rollups WHERE product_id = ? AND period = ? ORDER BY bucket""", (product_id, period))
+    return [dict(r) for r in cur.fetchall()]
+
+def get_price_summary(product_id):
+    """min / max / avg / число записей по всей истории — из помесячных агрегатов; для пустой истории — None."""
+    cur = connection().cursor()
+    cur.execute("""SELECT SUM(n) AS count, MIN(min_price) AS min, MAX(max_price) AS max, SUM(sum_price) / SUM(n) AS avg
+                   FROM price_rollups WHERE product_id = ? AND period = 'month'""", (product_id,))
+    row = dict(cur.fetchone())
+    return row if row["count"] else None
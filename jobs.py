@@ -0,0 +1,95 @@
+# jobs.py
+import logging
+from PySide6.QtCore import QCoreApplication, QObject, QRunnable, QThread, QThreadPool, Signal
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    # объект создаётся в GUI-потоке, поэтому слоты вызываются там же (queued connection)
+    progress = Signal(int, str)
+    result = Signal(object)
+    error = Signal(str)
+    finished = Signal()
+
+
+class Job(QRunnable):
+    """
+    Фоновая задача для QThreadPool.
+    fn(job, *args, **kwargs) выполняется в рабочем потоке; внутри можно вызывать
+    job.report(percent, text) — это и прогресс, и точка отмены (бросает JobCancelled).
+    Результат / ошибка приходят сигналами в GUI-поток.
+    """
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn; self.args = args; self.kwargs = kwargs
+        self.signals = JobSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def report(self, percent, text=""):
+        if self._cancelled:
+            raise JobCancelled()
+        self.signals.progress.emit(int(percent), text)
+
+    def run(self):
+        try:
+            res = self.fn(self, *self.args, **self.kwargs)
+        except JobCancelled:
+            logging.info("Задача %s отменена", getattr(self.fn, "__name__", self.fn))
+        except Exception as e:
+            logging.exception("Задача %s завершилась ошибкой", getattr(self.fn, "__name__", self.fn))
+            self.signals.error.emit(str(e))
+        else:
+            if not self._cancelled:
+                self.signals.result.emit(res)
+        finally:
+            self.signals.finished.emit()
+
+
+def start_job(fn, *args, on_result=None, on_error=None, on_progress=None, on_finished=None, pool=None, **kwargs):
+    job = Job(fn, *args, **kwargs)
+    if on_result: job.signals.result.connect(on_result)
+    if on_error: job.signals.error.connect(on_error)
+    if on_progress: job.signals.progress.connect(on_progress)
+    if on_finished: job.signals.finished.connect(lambda: on_finished(job))
+    (pool or QThreadPool.globalInstance()).start(job)
+    return job
+
+
+_background_pool = None
+_background_jobs = set()
+
+def start_background_job(fn, *args, on_finished=None, **kwargs):
+    """
+    Необязательная работа «на потом» (например, подготовка данных для окна, которое ещё не открыто):
+    отдельный пул из одного потока с низким приоритетом, поэтому задачи пользователя
+    в глобальном пуле её не ждут. Ошибки только пишутся в лог; при выходе из приложения
+    задачи отменяются (на ближайшем job.report).
+    """
+    global _background_pool
+    if _background_pool is None:
+        _background_pool = QThreadPool()
+        _background_pool.setMaxThreadCount(1)
+        _background_pool.setThreadPriority(QThread.LowPriority)
+        QCoreApplication.instance().aboutToQuit.connect(stop_background_jobs)
+    def finished(job):
+        _background_jobs.discard(job)
+        if on_finished: on_finished(job)
+    job = start_job(fn, *args, pool=_background_pool, on_finished=finished, **kwargs)
+    _background_jobs.add(job)
+    return job
+
+def stop_background_jobs():
+    """Отменяет фоновые задачи и ждёт их завершения, пока сигналы задач ещё живы."""
+    for job in list(_background_jobs):
+        job.cancel()
+    if _background_pool is not None:
+        _background_pool.waitForDone()
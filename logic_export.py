@@ -1,50 +1,78 @@
 # logic_export.py
+import numpy as np
 import pandas as pd
-from db import get_product_mapping, get_all_products
 
-def build_final_table(proc_df, supplier_id, product_mapping_fn, products_fn):
+def build_final_table(proc_df, supplier_id, mappings_fn, products_fn):
     """
     proc_df: dataframe with columns 'name','qty','price','sum' (internal)
+    mappings_fn(supplier_id, names) -> {supplier_name: my_id} (one bulk lookup, e.g. get_product_mappings_bulk)
+    products_fn() -> {my_id: product} (e.g. get_catalog().by_id)
     Returns df_final (Код, Наименование, Количество, Закупочная цена), price_updates list (my_id, avg_price)
+    Columnar: names are mapped once, lines are grouped by my_id (unmapped ones by supplier name)
+    and qty / qty*price are summed per group in line order.
     """
-    df = proc_df.copy()
-    df['name'] = df.get('name', '')
-    rows = []
-    for _, r in df.iterrows():
-        sname = str(r.get('name','')).strip()
-        qty = float(r.get('qty', 0) or 0)
-        price = float(r.get('price', 0) or 0)
-        my_id = product_mapping_fn(supplier_id, sname)
-        rows.append({'supplier_name': sname, 'qty': qty, 'price': price, 'my_id': my_id})
-    agg = {}
-    for r in rows:
-        key = r['my_id'] if r['my_id'] is not None else ('__unmapped__:'+r['supplier_name'])
-        rec = agg.get(key, {'qty':0.0, 'cost':0.0, 'names':[]})
-        rec['qty'] += r['qty']
-        rec['cost'] += r['qty'] * r['price']
-        rec['names'].append(r['supplier_name'])
-        agg[key] = rec
-    products = {p['id']: p for p in products_fn()}
-    final_rows = []
-    price_updates = []
-    for key, rec in agg.items():
-        if isinstance(key, int):
-            my_id = key
+    if proc_df.empty:
+        return pd.DataFrame(), []
+    names = proc_df['name'].map(str).str.strip() if 'name' in proc_df.columns else pd.Series('', index=proc_df.index)
+    qty = _numeric(proc_df, 'qty')
+    price = _numeric(proc_df, 'price')
+    mapping = pd.DataFrame(list(mappings_fn(supplier_id, set(names)).items()), columns=['name', 'my_id'])
+    lines = pd.DataFrame({'name': names.to_numpy(), 'qty': qty, 'cost': qty * price})
+    lines = lines.merge(mapping.dropna(), on='name', how='left', sort=False)
+    mapped = lines['my_id'].notna().to_numpy()
+    key = np.where(mapped, '#' + lines['my_id'].astype('Int64').astype(str), '@' + lines['name'])
+    codes, uniques = pd.factorize(key, sort=False)
+    n = len(uniques)
+    # np.add.at accumulates strictly in line order, same as a running sum per group
+    total_qty = np.zeros(n); cost = np.zeros(n)
+    np.add.at(total_qty, codes, lines['qty'].to_numpy())
+    np.add.at(cost, codes, lines['cost'].to_numpy())
+    first = np.unique(codes, return_index=True)[1]
+    first_ids = lines['my_id'].to_numpy()[first]
+    first_names = lines['name'].to_numpy()[first]
+
+    products = products_fn()
+    codes_out, names_out, prices_out, price_updates = [], [], [], []
+    for i in range(n):
+        avg_price = round(float(cost[i] / total_qty[i]), 2) if total_qty[i] > 0 else 0.0
+        if mapped[first[i]]:
+            my_id = int(first_ids[i])
             p = products.get(my_id)
             name = p['my_name'] if p else ''
             code = p['code'] if p and 'code' in p.keys() else ''
+            price_updates.append((my_id, avg_price))
+            key_i = my_id
         else:
-            my_id = None
-            name = rec['names'][0] if rec['names'] else ''
+            name = first_names[i]
             code = ''
-        total_qty = rec['qty']
-        avg_price = (rec['cost'] / total_qty) if total_qty > 0 else 0.0
-        avg_price = round(avg_price, 2)
-        if my_id is not None:
-            price_updates.append((my_id, avg_price))
-        final_rows.append({'Код': code, 'Наименование': name if name else key, 'Количество': total_qty, 'Закупочная цена': avg_price})
-    out_df = pd.DataFrame(final_rows)
+            key_i = '__unmapped__:' + first_names[i]
+        codes_out.append(code); names_out.append(name if name else key_i); prices_out.append(avg_price)
+    out_df = pd.DataFrame({'Код': codes_out, 'Наименование': names_out,
+                           'Количество': total_qty.tolist(), 'Закупочная цена': prices_out})
     return out_df, price_updates
 
+def _numeric(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col]).fillna(0).to_numpy(dtype=float)
+
+def price_report_table(report):
+    """
+    report: DataFrame из logic_price.price_change_report
+    Returns df (ID, Код, Наименование, Дата, Последняя цена, Предыдущая цена, Изменение %, Волатильность %, Записей)
+    для просмотра и выгрузки в Excel.
+    """
+    return pd.DataFrame({
+        'ID': report['product_id'],
+        'Код': report['code'],
+        'Наименование': report['name'],
+        'Дата': report['last_date'],
+        'Последняя цена': report['last_price'].round(2),
+        'Предыдущая цена': report['prev_price'].round(2),
+        'Изменение %': report['change_pct'].round(2),
+        'Волатильность %': report['volatility_pct'].round(2),
+        'Записей': report['records'],
+    })
+
 def save_to_excel(df, path):
     df.to_excel(path, index=False)
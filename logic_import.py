@@ -1,37 +1,176 @@
 import pandas as pd
+import numpy as np
 import re
-from rapidfuzz import fuzz
+import os
+import math
+import logging
+import multiprocessing
+import time
+import hashlib
+import pickle
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
 
+PDF_WORKERS = None            # None → os.cpu_count()
+PDF_PARALLEL_MIN_PAGES = 8    # меньше страниц — читаем в текущем процессе
+
+EXCEL_CHUNK_ROWS = 20000      # строк в порции при потоковом чтении .xlsx
+EXCEL_HEAD_ROWS = 1000        # столько строк .xlsx читается для выбора колонок
+
+CACHE_DIR = Path(__file__).parent / "cache"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+PARSER_VERSION = 1            # увеличить при любом изменении разбора файлов — старый кэш перестанет использоваться
+
+# Шаблоны очистки. Передаются в pandas строками: для str-колонок (pyarrow) pandas отдаёт их в pyarrow.compute,
+# который компилирует шаблон один раз на колонку; скомпилированный re.Pattern заставил бы pandas идти по строкам в Python.
+HEADER_WORDS_RE = "наим|кол|цена|ед|сум"     # повторённая внутри таблицы строка заголовков
+TOTALS_RE = "ИТОГО|ВСЕГО|TOTAL"
+NON_NUMERIC_RE = r"[^\d\.,\-]"              # всё, кроме цифр и . , - (в т.ч. пробелы и \xa0)
+
 
 # =============== 1. Чтение Excel или PDF =====================
-def read_supplier_file(path):
+def read_supplier_file(path, pdf_workers=None):
     """
     Определяет тип файла и возвращает DataFrame поставщика.
     PDF → конвертируется в таблицу автоматически.
     """
-    path = str(path).lower()
+    path = str(path)
+    ext = path.lower()
 
-    if path.endswith(".pdf"):
-        return read_pdf_as_df(path)
+    if ext.endswith(".pdf"):
+        return read_pdf_as_df(path, workers=pdf_workers)
 
-    if path.endswith(".xls") or path.endswith(".xlsx"):
+    if ext.endswith(".xls") or ext.endswith(".xlsx"):
         return pd.read_excel(path)
 
     raise ValueError("Неподдерживаемый формат файла")
 
 
+# =============== Кэш разобранных файлов ======================
+def file_digest(path, chunk_size=1 << 20):
+    """Хэш содержимого файла (blake2b, hex)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_supplier_file_cached(path, pdf_workers=None):
+    """
+    read_supplier_file с дисковым кэшем в CACHE_DIR (рядом с database.db).
+    Ключ — хэш содержимого + PARSER_VERSION, поэтому переименование файла кэш не сбрасывает,
+    а изменение содержимого — сбрасывает. Кэш ограничен CACHE_MAX_BYTES, старые записи удаляются (LRU).
+    Очищенные данные кэширует prepare_supplier_file — под своим ключом.
+    """
+    return _cached(_cache_key(path), lambda: read_supplier_file(path, pdf_workers=pdf_workers), path)
+
+
+def _cache_key(path, *parts):
+    return "-".join([file_digest(path), *parts, f"v{PARSER_VERSION}"])
+
+
+def _cached(key, build, path):
+    """DataFrame из кэша по key или build(); неполный разбор (page_errors) не сохраняется."""
+    df = _cache_load(key)
+    if df is not None:
+        return df
+    df = build()
+    if not df.attrs.get('page_errors'):
+        try:
+            _cache_store(key, df)
+        except Exception:
+            logging.exception("Не удалось сохранить кэш для %s", path)
+    return df
+
+
+def _cache_load(key):
+    for p in (CACHE_DIR / f"{key}.feather", CACHE_DIR / f"{key}.pkl"):
+        if p.exists():
+            try:
+                if p.suffix == ".feather":
+                    from pyarrow import feather
+                    df = feather.read_table(p).to_pandas()
+                else:
+                    with open(p, "rb") as f:
+                        df = pickle.load(f)
+                p.touch()  # mtime = время последнего использования
+                return df
+            except Exception:
+                logging.exception("Повреждённая запись кэша %s", p)
+                p.unlink(missing_ok=True)
+    return None
+
+
+def _cache_store(key, df):
+    CACHE_DIR.mkdir(exist_ok=True)
+    try:
+        # колоночный формат, если таблица переживает его без изменений (уникальные строковые
+        # заголовки, однотипные колонки); иначе — pickle
+        import pyarrow as pa
+        from pyarrow import feather
+        dest = CACHE_DIR / f"{key}.feather"
+        feather.write_feather(pa.Table.from_pandas(df), dest)
+        if feather.read_table(dest).to_pandas().equals(df):
+            return _cache_evict()
+        dest.unlink()
+    except Exception:
+        (CACHE_DIR / f"{key}.feather").unlink(missing_ok=True)
+    with open(CACHE_DIR / f"{key}.pkl", "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    _cache_evict()
+
+
+def _cache_evict():
+    files = sorted((p for p in CACHE_DIR.iterdir() if p.is_file()), key=lambda p: p.stat().st_mtime, reverse=True)
+    total = 0
+    for p in files:
+        total += p.stat().st_size
+        if total > CACHE_MAX_BYTES:
+            p.unlink(missing_ok=True)
+
+
 # =============== PDF обработка ======================
-def read_pdf_as_df(path):
-    tables = []
+def _extract_pages(path, start, stop):
+    """Таблицы страниц [start, stop): [(page_no, table | None, error | None)]. Выполняется и в дочерних процессах."""
+    out = []
     with pdfplumber.open(path) as pdf:
-        for page in pdf.pages:
+        for i in range(start, stop):
             try:
-                table = page.extract_table()
-                if table:
-                    tables.append(pd.DataFrame(table))
-            except:
-                pass
+                out.append((i, pdf.pages[i].extract_table(), None))
+            except Exception as e:
+                out.append((i, None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def read_pdf_as_df(path, workers=None):
+    """
+    Таблицы со всех страниц PDF в один DataFrame.
+    Большие файлы делятся на диапазоны страниц и читаются в пуле процессов (workers, по умолчанию
+    PDF_WORKERS или число ядер); порядок страниц сохраняется. Страницы, которые не удалось прочитать,
+    пишутся в лог и возвращаются в df.attrs['page_errors'] как [(номер страницы, ошибка)].
+    """
+    with pdfplumber.open(path) as pdf:
+        n_pages = len(pdf.pages)
+    workers = min(workers or PDF_WORKERS or os.cpu_count() or 1, n_pages)
+
+    if workers <= 1 or n_pages < PDF_PARALLEL_MIN_PAGES:
+        results = _extract_pages(path, 0, n_pages)
+    else:
+        # по два диапазона на процесс — чтобы медленные страницы не задерживали весь пул
+        step = math.ceil(n_pages / (workers * 2))
+        starts = list(range(0, n_pages, step))
+        stops = [min(s + step, n_pages) for s in starts]
+        # spawn и на Linux: fork из многопоточного процесса (GUI, пул QThreadPool) может унести в дочерний
+        # процесс захваченные другими потоками блокировки
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+            results = [r for part in ex.map(_extract_pages, [path] * len(starts), starts, stops) for r in part]
+
+    errors = [(i + 1, err) for i, _, err in results if err]
+    for page_no, err in errors:
+        logging.warning("PDF %s: страница %s не прочитана: %s", path, page_no, err)
+    tables = [pd.DataFrame(table) for _, table, _ in results if table]
 
     if not tables:
         raise ValueError("PDF не содержит табличных данных")
@@ -41,6 +180,7 @@ def read_pdf_as_df(path):
     # первая строка — заголовок
     df.columns = df.iloc[0]
     df = df[1:]
+    df.attrs['page_errors'] = errors
 
     return df
 
@@ -62,10 +202,11 @@ def remove_totals_rows(df):
     # Основная колонка для проверки — первая
     name_col = cols[0]
 
+    names = df[name_col].astype(str)
     cleaned = df[
         df[name_col].notna() &
-        df[name_col].astype(str).str.strip().ne("") &
-        ~df[name_col].astype(str).str.upper().str.contains("ИТОГО|ВСЕГО|TOTAL")
+        names.str.strip().ne("") &
+        ~names.str.upper().str.contains(TOTALS_RE)
     ]
 
     return cleaned
@@ -82,22 +223,28 @@ def clean_supplier_df(df):
 
     df = df.dropna(how="all")
     df = df.drop_duplicates()
+    return _clean_rows(df)
 
-    # убираем строки, где название похоже на заголовки
-    header_words = ["наим", "кол", "цена", "ед", "сум"]
-    first_col = df.columns[0]
 
-    def row_is_header(val):
-        if not isinstance(val, str):
-            return False
-        val = val.lower()
-        return any(w in val for w in header_words)
+def _clean_rows(df):
+    """Построчная часть clean_supplier_df (без удаления дублей) — годится и для отдельных порций."""
+    return _strip_names(_drop_header_rows(df))
+
 
-    df = df[~df[first_col].apply(row_is_header)]
+def _drop_header_rows(df):
+    """Убираем строки, где первая колонка — текст, похожий на заголовки."""
+    col = df[df.columns[0]]
+    try:
+        # у нестроковых значений .str.lower() даёт NaN → na=False
+        is_header = col.str.lower().str.contains(HEADER_WORDS_RE, na=False)
+    except AttributeError:  # в колонке нет ни одной строки
+        return df
+    return df[~is_header]
 
-    # чистим названия
-    df[first_col] = df[first_col].astype(str).apply(lambda x: x.strip())
 
+def _strip_names(df):
+    first_col = df.columns[0]
+    df[first_col] = df[first_col].astype(str).str.strip()
     return df
 
 
@@ -129,3 +276,205 @@ def map_columns_by_keywords(df):
                 mapping[col] = logical
 
     return mapping
+
+
+# =============== 5. Подготовка данных поставщика ==================
+def prepare_supplier_df(df, mapping):
+    """
+    Собираем внутренний DataFrame (name, qty, price, sum) по сопоставлению колонок,
+    очищаем и приводим числовые колонки к float (нечисловое → 0).
+    """
+    return CleaningPipeline(mapping).run(df)
+
+
+def _project(df, mapping):
+    proc = pd.DataFrame()
+    for file_col, logical in mapping.items():
+        if file_col in df.columns and logical in ("name","qty","price","sum"):
+            proc[logical] = df[file_col]
+    return proc
+
+
+def _coerce_numeric(proc):
+    for c in ("qty","price","sum"):
+        if c not in proc.columns:
+            proc[c] = 0.0
+        elif proc[c].dtype.kind != "i":  # целые из Excel уже числа — строковый круг их не меняет
+            # значения в колонке повторяются (количества, цены) — чистим и разбираем только уникальные;
+            # NON_NUMERIC_RE убирает и пробелы с \xa0: два прохода вместо пяти
+            codes, uniques = pd.factorize(proc[c].astype(str))
+            s = pd.Series(uniques).str.replace(NON_NUMERIC_RE, '', regex=True).str.replace(',', '.', regex=False)
+            values = pd.to_numeric(s, errors='coerce').to_numpy()
+            if (codes < 0).any():  # NaN в исходной колонке: код -1 → последний элемент
+                values = np.append(values.astype(float), np.nan)
+            proc[c] = pd.Series(values[codes], index=proc.index).fillna(0)
+    return proc
+
+
+class CleaningPipeline:
+    """
+    Подготовка данных поставщика по стадиям: project → [totals] → drop_empty → dedupe → headers → strip → numeric.
+    Все стадии — векторные операции pandas над колонками (для str-колонок их выполняет pyarrow), без apply по строкам.
+    run(df) — весь файл сразу, run_chunks(chunks) — порциями; дубли в этом случае ищутся по всему файлу.
+    timings — секунды по стадиям за все вызовы (report() — то же строкой для лога).
+    """
+    def __init__(self, mapping, drop_totals=False):
+        self.mapping = mapping
+        self.stages = [("project", lambda df: _project(df, self.mapping))]
+        if drop_totals:
+            self.stages.append(("totals", remove_totals_rows))
+        self.stages += [
+            ("drop_empty", lambda df: df.dropna(how="all")),
+            ("dedupe", self._dedupe),
+            ("headers", _drop_header_rows),
+            ("strip", _strip_names),
+            ("numeric", _coerce_numeric),
+        ]
+        self.timings = {name: 0.0 for name, _ in self.stages}
+        self._seen = None
+
+    def fingerprint(self):
+        """Хэш настроек (сопоставление колонок по порядку и состав стадий) — часть ключа кэша очищенных данных."""
+        text = repr(([(str(c), str(l)) for c, l in self.mapping.items()], [name for name, _ in self.stages]))
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+    def run(self, df):
+        self._seen = None
+        return self._run(df).reset_index(drop=True)
+
+    def run_chunks(self, chunks):
+        self._seen = set()
+        for df in chunks:
+            df.columns = [str(c).strip() for c in df.columns]
+            yield self._run(df)
+
+    def _run(self, df):
+        for name, stage in self.stages:
+            t = time.perf_counter()
+            df = stage(df)
+            self.timings[name] += time.perf_counter() - t
+        return df
+
+    def _dedupe(self, df):
+        if self._seen is None:
+            return df.drop_duplicates()
+        # порции: помним сами уже встреченные строки (не хэши — при совпадении хэшей строка потерялась бы)
+        keep = []
+        for row in df.itertuples(index=False, name=None):
+            # NaN ≠ NaN, а drop_duplicates считает их равными — заменяем на None
+            key = tuple(None if v != v else v for v in row)
+            keep.append(key not in self._seen)
+            self._seen.add(key)
+        return df[np.array(keep, dtype=bool)]
+
+    def report(self):
+        return ", ".join(f"{name} {sec * 1000:.0f} мс" for name, sec in self.timings.items())
+
+
+# =============== 6. Потоковое чтение больших файлов ==================
+def iter_excel_chunks(path, chunk_rows=EXCEL_CHUNK_ROWS, dtype=object):
+    """
+    Первый лист .xlsx порциями DataFrame по chunk_rows строк (openpyxl read_only, файл целиком в память не попадает).
+    Ячейки разбираются как в pd.read_excel (те же преобразования ячеек и NA-значения, пустые строки в середине
+    сохраняются, в конце — отбрасываются). Отличия от pd.read_excel:
+    - заголовок — первая непустая строка: пустые строки в начале листа пропускаются (pd.read_excel дал бы
+      колонки Unnamed: n, а настоящий заголовок — строкой данных);
+    - колонки не приводятся к общему типу: порция не знает остальных строк, поэтому по умолчанию (dtype=object)
+      текст остаётся текстом, а числа — числами, как они записаны в Excel;
+    - ячейки правее последнего заголовка не читаются.
+    Индекс сквозной по всему листу. Если строк нет — одна пустая порция с колонками, у пустого листа — без колонок.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import ERROR_CODES
+    from pandas.io.parsers import TextParser
+
+    def convert(v):
+        # как OpenpyxlReader._convert_cell: пустая ячейка → "", целое число → int, ошибка → NaN
+        if v is None: return ""
+        if isinstance(v, float): return int(v) if v.is_integer() else v
+        if isinstance(v, str) and v in ERROR_CODES: return np.nan
+        return v
+
+    def parse(header, rows, offset):
+        df = TextParser([header] + rows, header=0, skip_blank_lines=False, dtype=dtype).read()
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        return df
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        header = None; buf = []; blank = 0; offset = 0; emitted = False
+        for raw in ws.iter_rows(values_only=True):
+            row = [convert(v) for v in raw]
+            while row and row[-1] == "":
+                row.pop()
+            if header is None:
+                if row:
+                    header = row; width = len(header)
+                continue
+            if not row:
+                blank += 1  # пустые строки копим счётчиком: в конце листа они отбрасываются
+                continue
+            while blank:
+                buf.append([""] * width); blank -= 1
+                if len(buf) >= chunk_rows:
+                    yield parse(header, buf, offset); offset += len(buf); buf = []; emitted = True
+            buf.append(row[:width] + [""] * (width - len(row)))
+            if len(buf) >= chunk_rows:
+                yield parse(header, buf, offset); offset += len(buf); buf = []; emitted = True
+        if header is None:
+            yield pd.DataFrame()
+        elif buf or not emitted:
+            yield parse(header, buf, offset)
+    finally:
+        wb.close()
+
+
+def read_supplier_head(path, pdf_workers=None):
+    """
+    Данные для выбора колонок: у .xlsx — только первые EXCEL_HEAD_ROWS строк, у PDF / .xls — весь файл.
+    Оба варианта кэшируются по содержимому файла.
+    """
+    if str(path).lower().endswith(".xlsx"):
+        def head():
+            chunks = iter_excel_chunks(path, EXCEL_HEAD_ROWS)
+            try:
+                return next(chunks, pd.DataFrame())
+            finally:
+                chunks.close()  # закрываем книгу сразу, не дожидаясь сборщика мусора
+        return _cached(_cache_key(path, f"head{EXCEL_HEAD_ROWS}"), head, path)
+    return read_supplier_file_cached(path, pdf_workers=pdf_workers)
+
+
+def iter_supplier_chunks(path, head=None, chunk_rows=EXCEL_CHUNK_ROWS, pdf_workers=None):
+    """Порции файла поставщика: .xlsx читается потоково, остальное — целиком (head, если уже прочитан)."""
+    if str(path).lower().endswith(".xlsx"):
+        yield from iter_excel_chunks(path, chunk_rows)
+    else:
+        yield head if head is not None else read_supplier_file_cached(path, pdf_workers=pdf_workers)
+
+
+def prepare_supplier_file(path, mapping, head=None, chunk_rows=EXCEL_CHUNK_ROWS, pdf_workers=None):
+    """
+    Внутренний DataFrame (name, qty, price, sum) файла поставщика; .xlsx читается потоково.
+    Результат кэшируется по хэшу содержимого и CleaningPipeline.fingerprint(): повторное открытие
+    того же файла с тем же сопоставлением не читает и не чистит его заново.
+    """
+    pipeline = CleaningPipeline(mapping)
+
+    def build():
+        src = head
+        if src is None and not str(path).lower().endswith(".xlsx"):
+            src = read_supplier_file_cached(path, pdf_workers=pdf_workers)
+        parts = list(pipeline.run_chunks(iter_supplier_chunks(path, src, chunk_rows, pdf_workers)))
+        if not parts:
+            raise ValueError("Файл не содержит данных")
+        logging.info("Очистка %s: %s", Path(path).name, pipeline.report())
+        proc = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+        if src is not None and src.attrs.get('page_errors'):
+            proc.attrs['page_errors'] = src.attrs['page_errors']
+        return proc
+
+    return _cached(_cache_key(path, "clean", pipeline.fingerprint()), build, path)
+
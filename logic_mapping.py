@@ -0,0 +1,73 @@
+# logic_mapping.py
+import threading
+from collections import OrderedDict
+from db import get_header_mapping, save_header_mapping
+from text_utils import header_fingerprint, header_key
+
+LOGICAL_COLUMNS = {"name": "Наименование", "qty": "Количество", "price": "Цена", "sum": "Сумма"}
+MAPPING_CACHE_SIZE = 256
+
+# =============== LRU сопоставлений по отпечатку заголовка ======================
+# (supplier_id, header_fingerprint) -> {file_column: logical_column или None}
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(key):
+    with _cache_lock:
+        mapping = _cache.get(key)
+        if mapping is not None:
+            _cache.move_to_end(key)
+            return dict(mapping)
+    return None
+
+def _cache_put(key, mapping):
+    with _cache_lock:
+        _cache[key] = dict(mapping)
+        _cache.move_to_end(key)
+        while len(_cache) > MAPPING_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def saved_mapping(supplier_id, columns):
+    """
+    Сопоставление, которое пользователь подтвердил (remember_mapping) для файла поставщика с таким же
+    заголовком, или None. Заголовки, разобранные только по ключевым словам, сохранёнными не считаются.
+    Колонки сверяются без учёта регистра и лишних пробелов — как в header_fingerprint.
+    """
+    columns = list(columns)
+    key = (supplier_id, header_fingerprint(columns))
+    mapping = _cache_get(key)
+    if mapping is not None:
+        return mapping
+    saved = {header_key(c): logical for c, logical in get_header_mapping(*key).items()}
+    if not any(v in LOGICAL_COLUMNS for v in saved.values()):
+        return None
+    mapping = {c: saved.get(header_key(c)) for c in columns}
+    _cache_put(key, mapping)
+    return mapping
+
+
+def resolve_mapping(df, supplier_id=None):
+    """
+    Сопоставление колонок df → (mapping, source): source = 'saved', если применено сохранённое
+    для этого заголовка, иначе 'keywords' (map_columns_by_keywords).
+    """
+    if supplier_id is not None:
+        mapping = saved_mapping(supplier_id, df.columns)
+        if mapping is not None:
+            return mapping, "saved"
+    from logic_import import map_columns_by_keywords  # тянет pandas и pdfplumber
+    return map_columns_by_keywords(df), "keywords"
+
+
+def remember_mapping(supplier_id, columns, mapping):
+    """
+    Запоминает подтверждённое пользователем сопоставление колонок файла.
+    Следующий файл поставщика с тем же заголовком получит его через resolve_mapping;
+    колонки, оставленные без данных, так и останутся неиспользуемыми.
+    """
+    columns = list(columns)
+    mapping = {c: mapping.get(c) for c in columns}
+    key = (supplier_id, header_fingerprint(columns))
+    save_header_mapping(*key, mapping)
+    _cache_put(key, mapping)
@@ -0,0 +1,164 @@
+# logic_matching.py
+import numpy as np
+from db import catalog_revision, changed_product_ids, get_match_candidates, save_match_candidates
+from logic_products import normalize_name, get_catalog
+
+MATCH_TOP_K = 5
+try:
+    from rapidfuzz import fuzz, process
+    def similarity(a,b):
+        return fuzz.token_set_ratio(str(a), str(b))
+except Exception:
+    import difflib
+    fuzz = process = None
+    def similarity(a,b):
+        return int(difflib.SequenceMatcher(None, str(a), str(b)).ratio()*100)
+
+
+def _trigrams(s):
+    s = f" {s} "
+    return {s[i:i+3] for i in range(len(s)-2)}
+
+
+# =============== Индекс кандидатов ======================
+class CandidateIndex:
+    """
+    Инвертированный индекс по токенам и триграммам normalize_name(choice).
+    Вместо сравнения строки поставщика со всем каталогом оцениваем только
+    короткий список позиций с наибольшим числом общих токенов/триграмм.
+    Используется только без rapidfuzz (он необязателен: см. импорт выше) — оценка difflib
+    по всему каталогу слишком медленная; с rapidfuzz top_k_matches считает всю матрицу.
+    """
+    TOKEN_WEIGHT = 3
+
+    def __init__(self, choices, limit=50):
+        self.limit = limit
+        self.names = []
+        tokens = {}; grams = {}
+        for pos, c in enumerate(choices):
+            self.names.append(str(c).lower())
+            norm = normalize_name(c)
+            for t in set(norm.split()):
+                tokens.setdefault(t, []).append(pos)
+            for g in _trigrams(norm):
+                grams.setdefault(g, []).append(pos)
+        self._tokens = {k: np.asarray(v, dtype=np.int32) for k, v in tokens.items()}
+        self._grams = {k: np.asarray(v, dtype=np.int32) for k, v in grams.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, text):
+        """Позиции кандидатов (по возрастанию, как в исходном каталоге)."""
+        n = len(self.names)
+        if n <= self.limit:
+            return list(range(n))
+        norm = normalize_name(text)
+        postings = [self._grams[g] for g in _trigrams(norm) if g in self._grams]
+        weights = [np.ones(len(a)) for a in postings]
+        for t in set(norm.split()):
+            a = self._tokens.get(t)
+            if a is not None:
+                postings.append(a); weights.append(np.full(len(a), self.TOKEN_WEIGHT))
+        if not postings:
+            return []
+        hits = np.bincount(np.concatenate(postings), weights=np.concatenate(weights), minlength=n)
+        # порог — балл limit-го по счёту кандидата; все товары с таким же баллом тоже проходят,
+        # иначе из равных выбор зависел бы от argpartition, а не от порядка каталога
+        cutoff = -np.partition(-hits, self.limit - 1)[self.limit - 1]
+        return np.flatnonzero((hits >= cutoff) & (hits > 0)).tolist()
+
+    def top_k(self, text, k=1, score_cutoff=0):
+        """До k лучших кандидатов [(pos, score), ...]; при равных баллах — раньше по каталогу."""
+        s = str(text).lower()
+        scored = [(pos, float(similarity(s, self.names[pos]))) for pos in self.candidates(text)]
+        scored = [c for c in scored if c[1] > 0 and c[1] >= score_cutoff]
+        scored.sort(key=lambda c: (-c[1], c[0]))
+        return scored[:k]
+
+
+# =============== Пакетная оценка ======================
+def score_matrix(queries, choices, score_cutoff=0, workers=-1):
+    """
+    Матрица оценок len(queries) x len(choices) той же метрикой, что similarity(),
+    через rapidfuzz process.cdist на всех ядрах (оценки ниже score_cutoff обнуляются).
+    """
+    return process.cdist(queries, choices, scorer=fuzz.token_set_ratio, dtype=np.float64,
+                         score_cutoff=score_cutoff, workers=workers)
+
+
+def top_k_matches(queries, choices, k=3, score_cutoff=0, workers=-1, chunk_size=512):
+    """
+    Для каждой строки queries — до k лучших позиций в choices: [(pos, score), ...].
+    Обе стороны приводятся к нижнему регистру один раз; матрица считается блоками
+    по chunk_size строк, чтобы память не росла с размером накладной.
+    При равных оценках раньше идёт позиция с меньшим индексом.
+    Без rapidfuzz оцениваются только кандидаты из CandidateIndex.
+    """
+    queries = [str(q).lower() for q in queries]
+    choices = [str(c).lower() for c in choices]
+    if not choices:
+        return [[] for _ in queries]
+    if process is None:
+        index = CandidateIndex(choices)
+        return [index.top_k(q, k, score_cutoff) for q in queries]
+    result = []
+    for start in range(0, len(queries), chunk_size):
+        m = score_matrix(queries[start:start+chunk_size], choices, score_cutoff, workers)
+        order = np.argsort(-m, axis=1, kind='stable')[:, :k]
+        for row, idx in zip(m, order):
+            result.append([(int(j), float(row[j])) for j in idx if row[j] > 0 and row[j] >= score_cutoff])
+    return result
+
+
+# =============== Сохранённые кандидаты ======================
+def refresh_match_candidates(supplier_id, supplier_names, k=MATCH_TOP_K, progress=None):
+    """
+    {supplier_name: [(my_product_id, score), ...]} — до k лучших товаров каталога, как top_k_matches
+    (по убыванию оценки, при равенстве — раньше по каталогу). Результат хранится в match_candidates
+    вместе с ревизией каталога (catalog_revision), поэтому пересчитывается только то, что могло измениться:
+    - новые имена — по всему каталогу;
+    - имена с кандидатами старой ревизии — только по товарам, добавленным или переименованным после неё;
+      если изменился или удалён один из сохранённых кандидатов, имя пересчитывается по всему каталогу.
+    progress: optional callback(fraction 0..1)
+    """
+    names = list(dict.fromkeys(str(n) for n in supplier_names))
+    revision = catalog_revision()
+    catalog = get_catalog()
+    pos = {r.id: i for i, r in enumerate(catalog.records)}
+    stored = get_match_candidates(supplier_id, names)
+    result, full, stale = {}, [], {}
+    for n in names:
+        if n not in stored:
+            full.append(n)
+        elif stored[n][0] >= revision:
+            result[n] = stored[n][1]
+        else:
+            stale.setdefault(stored[n][0], []).append(n)
+
+    updated = {}
+    for since, group in stale.items():
+        changed = changed_product_ids(since)
+        rescore = []
+        for n in group:
+            if any(mid in changed or mid not in pos for mid, _ in stored[n][1]):
+                full.append(n)
+            else:
+                rescore.append(n)
+        subset = [r for r in catalog.records if r.id in changed]
+        tops = top_k_matches(rescore, [r.my_name for r in subset], k=k) if subset else [[] for _ in rescore]
+        for n, top in zip(rescore, tops):
+            merged = stored[n][1] + [(subset[j].id, score) for j, score in top]
+            merged.sort(key=lambda c: (-c[1], pos[c[0]]))
+            updated[n] = merged[:k]
+    if progress: progress(0.2)
+
+    if full:
+        records = catalog.records
+        tops = top_k_matches(full, [r.my_name for r in records], k=k)
+        updated.update((n, [(records[j].id, score) for j, score in top]) for n, top in zip(full, tops))
+    if updated:
+        save_match_candidates(supplier_id, revision, updated)
+        result.update(updated)
+    if progress: progress(1.0)
+    return {n: result[n] for n in names}
@@ -1,8 +1,140 @@
 # logic_price.py
-from db import add_price_history, get_price_history_for_product
+import json
+import numpy as np
+import pandas as pd
+from db import transaction, touch_catalog, rollup_prices
+from logic_products import get_catalog
 
-def record_price_if_changed(product_id, new_price):
-    history = get_price_history_for_product(product_id)
-    last_price = history[0]['price'] if history else None
-    if last_price is None or float(new_price) != float(last_price):
-        add_price_history(product_id, new_price)
+REPORT_CHUNK = 50000
+
+def record_prices(price_updates):
+    """
+    Пакетная запись цен: price_updates — [(my_id, avg_price)] из build_final_table.
+    Текущие last_price читаются одним запросом; в price_history добавляются только изменившиеся цены,
+    last_price обновляется в той же транзакции. Возвращает число изменившихся товаров.
+    """
+    latest = {int(pid): float(price) for pid, price in price_updates}
+    if not latest:
+        return 0
+    with transaction() as cur:
+        cur.execute("SELECT id, last_price FROM my_products WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(list(latest)),))
+        current = {r["id"]: r["last_price"] for r in cur.fetchall()}
+        changed = [(pid, price) for pid, price in latest.items()
+                   if pid in current and (current[pid] is None or float(current[pid]) != price)]
+        first_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM price_history").fetchone()[0]
+        cur.executemany("INSERT INTO price_history (product_id, price) VALUES (?, ?)", changed)
+        rollup_prices(cur, "id > ?", (first_id,))
+        cur.executemany("UPDATE my_products SET last_price = ? WHERE id = ?", [(price, pid) for pid, price in changed])
+    if changed:
+        touch_catalog()
+    return len(changed)
+
+# =============== Аналитика истории цен ======================
+def price_deltas(prices):
+    """
+    prices — цены в порядке таблицы (как отдаёт get_price_history_for_product).
+    Возвращает (deltas, cumulative): Δ от предыдущей строки, округлённая до копеек (у первой 0),
+    и накопленная сумма Δ.
+    """
+    prices = np.asarray(prices, dtype=float)
+    deltas = np.zeros(len(prices))
+    if len(prices) > 1:
+        deltas[1:] = np.round(np.diff(prices), 2)
+    return deltas, np.cumsum(deltas)
+
+def rolling_mean(prices, window):
+    """Скользящее среднее по window точкам; первые точки усредняются по тому, что есть."""
+    prices = np.asarray(prices, dtype=float)
+    if not len(prices):
+        return prices
+    csum = np.concatenate(([0.0], np.cumsum(prices)))
+    ends = np.arange(1, len(prices) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (csum[ends] - csum[starts]) / (ends - starts)
+
+def lttb(x, y, threshold):
+    """
+    Индексы точек, которые оставляет Largest-Triangle-Three-Buckets: форма графика сохраняется,
+    а точек не больше threshold. Первая и последняя точки остаются всегда.
+    """
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold-2 корзины между первой и последней точкой
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    idx = np.empty(threshold, dtype=np.int64); idx[0] = 0; idx[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:nhi].mean(); avg_y = y[hi:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+# =============== Отчёт по изменению цен ======================
+def price_change_report(chunk_size=REPORT_CHUNK, progress=None):
+    """
+    Сводка по всем товарам с историей цен: последняя и предыдущая цена, изменение в %,
+    волатильность (ст. отклонение изменений между соседними записями, %), число записей.
+    price_history читается одним проходом по индексу (product_id, date) порциями fetchmany
+    и сворачивается NumPy: в памяти держатся только массивы размером с каталог.
+    progress: optional callback(fraction 0..1)
+    """
+    # одна транзакция чтения: размер массивов (MAX(product_id)) и сами строки берутся из одного снимка WAL,
+    # иначе запись с новым product_id, добавленная между запросами, не поместилась бы в массивы
+    with transaction() as cur:
+        cur.row_factory = None  # простые кортежи: sqlite3.Row на миллионах строк заметно дороже
+        size, total = cur.execute("SELECT COALESCE(MAX(product_id), 0) + 1, COUNT(*) FROM price_history").fetchone()
+        n = np.zeros(size, dtype=np.int64); n_ret = np.zeros(size, dtype=np.int64)
+        s1 = np.zeros(size); s2 = np.zeros(size)
+        last_price = np.full(size, np.nan); prev_price = np.full(size, np.nan); last_id = np.zeros(size, dtype=np.int64)
+        carry_pid, carry_price = -1, np.nan
+        done = 0
+        cur.execute("SELECT product_id, id, price FROM price_history ORDER BY product_id, date, id")
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            a = np.array(rows, dtype=float)
+            pid = a[:, 0].astype(np.int64); hid = a[:, 1].astype(np.int64); price = a[:, 2]
+            # предыдущая запись того же товара (первая строка порции — с учётом хвоста прошлой порции)
+            prev = np.empty(len(price)); prev[0] = carry_price if pid[0] == carry_pid else np.nan
+            prev[1:] = np.where(pid[1:] == pid[:-1], price[:-1], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ret = np.where(prev != 0, price / prev - 1, np.nan)
+            valid = ~np.isnan(ret)
+            n += np.bincount(pid, minlength=size)
+            n_ret += np.bincount(pid[valid], minlength=size)
+            s1 += np.bincount(pid[valid], ret[valid], minlength=size)
+            s2 += np.bincount(pid[valid], ret[valid] ** 2, minlength=size)
+            is_last = np.append(pid[1:] != pid[:-1], True)
+            last_price[pid[is_last]] = price[is_last]; prev_price[pid[is_last]] = prev[is_last]; last_id[pid[is_last]] = hid[is_last]
+            carry_pid, carry_price = pid[-1], price[-1]
+            done += len(rows)
+            if progress: progress(0.9 * done / total)
+
+        ids = np.flatnonzero(n)
+        cur.execute("SELECT id, date FROM price_history WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(last_id[ids].tolist()),))
+        dates = dict(cur.fetchall())
+    k = n_ret[ids]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.where(k > 1, (s2[ids] - s1[ids] ** 2 / k) / (k - 1), np.nan)
+    catalog = get_catalog().by_id
+    report = pd.DataFrame({
+        'product_id': ids,
+        'code': [(catalog[i].code or '') if i in catalog else '' for i in ids.tolist()],
+        'name': [catalog[i].my_name if i in catalog else f"#{i}" for i in ids.tolist()],
+        'last_date': [dates.get(i) for i in last_id[ids].tolist()],
+        'last_price': last_price[ids],
+        'prev_price': prev_price[ids],
+        'change_pct': (last_price[ids] / np.where(prev_price[ids] != 0, prev_price[ids], np.nan) - 1) * 100,
+        'volatility_pct': np.sqrt(np.clip(variance, 0, None)) * 100,
+        'records': n[ids],
+    })
+    if progress: progress(1.0)
+    return report.sort_values('name', kind='stable', ignore_index=True)
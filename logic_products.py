@@ -1,84 +1,169 @@
 # logic_products.py
-import re
-from db import add_my_product, get_all_products, update_my_product, get_connection
-import pandas as pd
+import threading
+import logging
+from db import get_all_products, transaction, catalog_version, touch_catalog, rebuild_price_rollups
+from text_utils import normalize_name
 
 def ensure_code_column():
     # схема уже содержит столбец code
     return
 
-def normalize_name(s: str) -> str:
-    if s is None:
-        return ""
-    s = str(s).lower()
-    s = re.sub(r'[^0-9a-zа-яё\.,\-]+', ' ', s)
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
+# =============== Кэш каталога ======================
+class ProductRecord:
+    """Компактная запись my_products; поддерживает доступ как у sqlite3.Row: p['my_name'], p.keys()."""
+    __slots__ = ("id", "my_name", "code", "category", "last_price", "created_at", "norm_name")
 
-def import_products_from_df(df: pd.DataFrame, replace_all: bool = False):
+    def __init__(self, row):
+        for k in self.__slots__:
+            setattr(self, k, row[k])
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def keys(self):
+        return self.__slots__
+
+
+class Catalog:
+    """
+    Снимок my_products: records (в порядке my_name, как get_all_products)
+    и словари by_id / by_code / by_name (normalize_name) для поиска за O(1).
+    """
+    def __init__(self, rows, version):
+        self.version = version
+        self.records = [ProductRecord(r) for r in rows]
+        self.by_id = {r.id: r for r in self.records}
+        self.by_code = {(r.code or '').strip(): r for r in self.records if r.code}
+        self.by_name = {r.norm_name: r for r in self.records}
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """Общий для всех окон каталог товаров; перечитывается только после изменений my_products."""
+    global _catalog
+    version = catalog_version()
+    cat = _catalog
+    if cat is None or cat.version != version:
+        with _catalog_lock:
+            cat = _catalog
+            if cat is None or cat.version != version:
+                cat = _catalog = Catalog(get_all_products(), version)
+    return cat
+
+def import_products_from_df(df: "pd.DataFrame", replace_all: bool = False, progress=None, dry_run: bool = False):
     """
     df: columns 'code', 'name'
     Behavior:
       - if code exists in DB => update code field (do not change my_name)
       - if code missing, attempt match by normalized name -> update code if empty (do not change my_name)
       - else create new product with name+code
+    Rows are classified against the catalogue in one vectorized pass and written with
+    executemany in a single transaction.
+    progress: optional callback(fraction 0..1)
+    dry_run: nothing is written; the report gets 'diff' with the planned changes
     """
-    existing = get_all_products()
-    existing_by_code = { (r['code'] or '').strip(): r for r in existing if r['code']}
-    existing_by_name = { normalize_name(r['my_name']): r for r in existing}
-    added = updated = 0
-    for _, row in df.iterrows():
-        code = str(row.get('code','')).strip()
-        name = str(row.get('name','')).strip()
-        if code and code in existing_by_code:
-            pid = existing_by_code[code]['id']
-            update_my_product(pid, code=code)
-            updated += 1
-        else:
-            nname = normalize_name(name)
-            if nname in existing_by_name:
-                pid = existing_by_name[nname]['id']
-                if code:
-                    update_my_product(pid, code=code)
-                updated += 1
-            else:
-                add_my_product(name, code=code)
-                added += 1
-    return {'added': added, 'updated': updated, 'deduped': 0}
-
-def dedupe_my_products_by_code_and_name():
+    import pandas as pd  # не на уровне модуля: каталог нужен главному окну ещё до загрузки pandas
+    catalog = get_catalog()
+    codes = df['code'].map(str).str.strip() if 'code' in df.columns else pd.Series('', index=df.index)
+    names = df['name'].map(str).str.strip() if 'name' in df.columns else pd.Series('', index=df.index)
+
+    # 1) по коду
+    code_ids = codes.map({c: r.id for c, r in catalog.by_code.items()})
+    by_code = codes.ne('') & code_ids.notna()
+    # 2) по нормализованному имени — только для строк без совпадения по коду
+    rest = ~by_code
+    name_ids = pd.Series(float('nan'), index=df.index, dtype=object)
+    name_ids[rest] = names[rest].map(normalize_name).map({n: r.id for n, r in catalog.by_name.items()})
+    by_name = rest & name_ids.notna()
+    to_insert = rest & ~by_name
+    if progress: progress(0.3)
+
+    # новое значение code для существующих товаров (последняя строка выигрывает, как при построчной записи)
+    writes = by_code | (by_name & codes.ne(''))
+    target_ids = code_ids.where(by_code, name_ids)
+    code_updates = {}
+    for pid, code in zip(target_ids[writes].astype(int), codes[writes]):
+        code_updates[pid] = code
+    code_updates = {pid: code for pid, code in code_updates.items() if catalog.by_id[pid].code != code}
+    inserts = list(zip(names[to_insert], codes[to_insert]))
+
+    report = {'added': int(to_insert.sum()), 'updated': int(by_code.sum() + by_name.sum()), 'deduped': 0}
+    if dry_run:
+        report['diff'] = {
+            'update_code': [(pid, catalog.by_id[pid].code, code) for pid, code in code_updates.items()],
+            'insert': inserts,
+        }
+        return report
+
+    with transaction() as cur:
+        cur.executemany("UPDATE my_products SET code = ? WHERE id = ?", [(code, pid) for pid, code in code_updates.items()])
+        if progress: progress(0.6)
+        cur.executemany("INSERT INTO my_products (my_name, category, code, last_price, norm_name) VALUES (?, '', ?, NULL, ?)",
+                        [(name, code, normalize_name(name)) for name, code in inserts])
+    touch_catalog()
+    if progress: progress(1.0)
+    logging.info("Импорт товаров: добавлено %s, обновлено %s (изменён код у %s)", report['added'], report['updated'], len(code_updates))
+    return report
+
+def dedupe_my_products_by_code_and_name(progress=None):
     """
     Удаляем дубли: оставляем запись с наименьшим id.
-    Переназначаем mappings.
+    Сначала дубли по коду, затем среди товаров без кода — по нормализованному имени (norm_name).
+    Пары (remove_id, keep_id) собираются оконной функцией во временную таблицу, после чего
+    mappings и историю цен переназначаем, а дубли удаляем — по одному запросу на таблицу;
+    price_rollups оставленных товаров пересчитываются.
+    progress: optional callback(fraction 0..1)
     Возвращаем отчёт.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    report = {'removed':0, 'reassigned':0}
-    # дубли по коду
-    cur.execute("SELECT code, COUNT(*) as cnt FROM my_products WHERE code IS NOT NULL AND code <> '' GROUP BY code HAVING cnt>1")
-    for row in cur.fetchall():
-        code = row['code']
-        cur.execute("SELECT id FROM my_products WHERE code = ? ORDER BY id ASC", (code,))
-        ids = [r['id'] for r in cur.fetchall()]
-        keep = ids[0]; remove = ids[1:]
-        for rid in remove:
-            cur.execute("UPDATE product_mappings SET my_product_id = ? WHERE my_product_id = ?", (keep, rid))
-            cur.execute("DELETE FROM my_products WHERE id = ?", (rid,))
-            report['removed'] += 1
-            report['reassigned'] += 1
-    # дубли по нормализованному имени (без кода)
-    cur.execute("SELECT id, my_name FROM my_products WHERE code IS NULL OR code = '' ORDER BY id ASC")
-    rows = cur.fetchall()
-    name_map = {}
-    for r in rows:
-        nid = r['id']; nm = normalize_name(r['my_name'])
-        if nm in name_map:
-            keep = name_map[nm]
-            cur.execute("UPDATE product_mappings SET my_product_id = ? WHERE my_product_id = ?", (keep, nid))
-            cur.execute("DELETE FROM my_products WHERE id = ?", (nid,))
-            report['removed'] += 1; report['reassigned'] += 1
-        else:
-            name_map[nm] = nid
-    conn.commit(); conn.close()
-    return report
+    def step(fraction):
+        if progress: progress(fraction)
+
+    with transaction() as cur:
+        # norm_name мог остаться пустым у строк, записанных в обход helper-функций
+        cur.execute("UPDATE my_products SET norm_name = normalize_name(my_name) WHERE norm_name IS NULL")
+        cur.execute("DROP TABLE IF EXISTS temp.dedupe_pairs")
+        cur.execute("CREATE TEMP TABLE dedupe_pairs (remove_id INTEGER PRIMARY KEY, keep_id INTEGER NOT NULL)")
+        step(0.1)
+        # дубли по коду
+        cur.execute("""
+            INSERT INTO dedupe_pairs (remove_id, keep_id)
+            SELECT id, keep_id FROM (
+                SELECT id, MIN(id) OVER (PARTITION BY code) AS keep_id
+                FROM my_products WHERE code IS NOT NULL AND code <> ''
+            ) WHERE id <> keep_id
+        """)
+        step(0.3)
+        # дубли по нормализованному имени (без кода)
+        cur.execute("""
+            INSERT INTO dedupe_pairs (remove_id, keep_id)
+            SELECT id, keep_id FROM (
+                SELECT id, MIN(id) OVER (PARTITION BY norm_name) AS keep_id
+                FROM my_products WHERE code IS NULL OR code = ''
+            ) WHERE id <> keep_id
+        """)
+        step(0.5)
+        removed = cur.execute("SELECT COUNT(*) FROM dedupe_pairs").fetchone()[0]
+        cur.execute("""
+            UPDATE product_mappings SET my_product_id = (SELECT keep_id FROM dedupe_pairs WHERE remove_id = my_product_id)
+            WHERE my_product_id IN (SELECT remove_id FROM dedupe_pairs)
+        """)
+        mappings = cur.rowcount
+        step(0.7)
+        cur.execute("""
+            UPDATE price_history SET product_id = (SELECT keep_id FROM dedupe_pairs WHERE remove_id = product_id)
+            WHERE product_id IN (SELECT remove_id FROM dedupe_pairs)
+        """)
+        prices = cur.rowcount
+        if prices:
+            # агрегаты удалённых товаров переезжают к оставленным — проще пересчитать их целиком
+            cur.execute("DELETE FROM price_rollups WHERE product_id IN (SELECT remove_id FROM dedupe_pairs)")
+            rebuild_price_rollups(cur, "product_id IN (SELECT DISTINCT keep_id FROM dedupe_pairs)")
+        step(0.85)
+        cur.execute("DELETE FROM my_products WHERE id IN (SELECT remove_id FROM dedupe_pairs)")
+        cur.execute("DROP TABLE temp.dedupe_pairs")
+    touch_catalog()
+    step(1.0)
+    logging.info("Дедупликация: удалено %s, переназначено mappings %s, цен %s", removed, mappings, prices)
+    return {'removed': removed, 'reassigned': removed, 'mappings_reassigned': mappings, 'prices_reassigned': prices}
@@ -0,0 +1,176 @@
+# logic_suppliers.py
+import re
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from db import get_suppliers
+from text_utils import normalize_name
+
+DETECT_ROWS = 30              # сколько первых строк таблицы просматривается при определении поставщика
+AUTO_CONFIDENCE = 0.8         # с такой уверенностью поставщик выбирается без вопроса...
+AUTO_MARGIN = 0.3             # ...если второй кандидат отстаёт хотя бы на столько
+MATCH_WEIGHTS = {"content": 0.8, "filename": 0.6}  # вес одного найденного шаблона по месту находки
+
+REGEX_PREFIX = "re:"          # шаблон с этим префиксом — регулярное выражение, остальные — обычные строки
+
+def split_patterns(text):
+    """suppliers.pattern → список шаблонов (по одному в строке)."""
+    return [p.strip() for p in (text or "").splitlines() if p.strip()]
+
+def is_regex(pattern):
+    return pattern.startswith(REGEX_PREFIX)
+
+def regex_body(pattern):
+    return pattern[len(REGEX_PREFIX):].strip()
+
+def pattern_errors(text):
+    """[(шаблон, ошибка)] для регулярных выражений, которые не компилируются."""
+    errors = []
+    for p in split_patterns(text):
+        if is_regex(p):
+            try:
+                if not regex_body(p):
+                    raise re.error("пустое выражение")
+                re.compile(regex_body(p))
+            except re.error as e:
+                errors.append((p, str(e)))
+    return errors
+
+
+# =============== Поиск многих строк за один проход ======================
+class AhoCorasick:
+    """Автомат Ахо — Корасик: все вхождения всех слов за один проход по тексту, сколько бы слов ни было."""
+    def __init__(self, words):
+        self.words = [w for w in words if w]
+        self.goto = [{}]; self.fail = [0]; self.out = [[]]
+        for i, word in enumerate(self.words):
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto); self.goto[node][ch] = nxt
+                    self.goto.append({}); self.fail.append(0); self.out.append([])
+                node = nxt
+            self.out[node].append(i)
+        # суффиксные ссылки — обход в ширину; у детей корня ссылка на корень
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if node else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, text):
+        """(начало, конец, номер слова) для каждого вхождения."""
+        goto, fail, out, words = self.goto, self.fail, self.out, self.words
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for i in out[node]:
+                yield pos + 1 - len(words[i]), pos + 1, i
+
+
+# =============== Определение поставщика ======================
+class SupplierDetector:
+    """
+    Шаблоны всех поставщиков (suppliers.pattern, по одному в строке): обычные строки (название, ИНН, часть
+    имени файла) после normalize_name ищутся одним автоматом AhoCorasick целыми словами, строки с префиксом
+    REGEX_PREFIX — как регулярные выражения. Одинаковый шаблон у нескольких поставщиков делит свой вес между ними.
+    """
+    def __init__(self, suppliers):
+        literals = {}; regexes = {}
+        for sid, text in suppliers:
+            for p in split_patterns(text):
+                if is_regex(p):
+                    try:
+                        body = regex_body(p)
+                        if not body:
+                            raise re.error("пустое выражение")
+                        regexes.setdefault(body, (re.compile(body, re.IGNORECASE), set()))[1].add(sid)
+                    except re.error:
+                        logging.warning("Шаблон поставщика %s не компилируется, пропущен: %s", sid, p)
+                    continue
+                literals.setdefault(normalize_name(p), set()).add(sid)
+        literals.pop("", None)
+        self.matcher = AhoCorasick(literals)
+        self.literal_owners = [literals[w] for w in self.matcher.words]
+        self.regexes = list(regexes.values())
+
+    def _found(self, text):
+        """Множества владельцев шаблонов, найденных в тексте (по одному на шаблон)."""
+        norm = normalize_name(text); found = {}
+        for start, end, i in self.matcher.finditer(norm):
+            # целым словом: соседний символ не продолжает букву / цифру шаблона
+            if start > 0 and norm[start - 1].isalnum() and norm[start].isalnum(): continue
+            if end < len(norm) and norm[end].isalnum() and norm[end - 1].isalnum(): continue
+            found[("lit", i)] = self.literal_owners[i]
+        for j, (rx, owners) in enumerate(self.regexes):
+            if rx.search(text):
+                found[("re", j)] = owners
+        return found.values()
+
+    def detect(self, filename, content):
+        """[(supplier_id, уверенность 0..1)] по убыванию уверенности; поставщики без совпадений не попадают."""
+        miss = {}
+        for source, text in (("filename", filename), ("content", content)):
+            for owners in self._found(text or ""):
+                w = MATCH_WEIGHTS[source] / len(owners)
+                for sid in owners:
+                    miss[sid] = miss.get(sid, 1.0) * (1 - w)  # находки независимы: 1 - П(1 - w)
+        return sorted(((sid, round(1 - m, 3)) for sid, m in miss.items()), key=lambda g: (-g[1], g[0]))
+
+
+_detector = None
+_detector_key = None
+_detector_lock = threading.Lock()
+
+def get_detector():
+    """Детектор по текущим шаблонам поставщиков; перестраивается, только когда шаблоны поменялись."""
+    global _detector, _detector_key
+    key = tuple((s["id"], s["pattern"]) for s in get_suppliers() if s["pattern"])
+    with _detector_lock:
+        if _detector is None or key != _detector_key:
+            _detector, _detector_key = SupplierDetector(key), key
+        return _detector
+
+
+def file_text(path, df=None, rows=DETECT_ROWS):
+    """Текст файла для поиска шаблонов: заголовки и первые строки таблицы, у PDF — ещё текст первой страницы."""
+    parts = []
+    if df is not None:
+        import pandas as pd
+        parts += [str(c) for c in df.columns if not str(c).startswith("Unnamed:")]
+        for row in df.head(rows).itertuples(index=False, name=None):
+            parts += [str(v) for v in row if not pd.isna(v) and v != ""]
+    if str(path).lower().endswith(".pdf"):
+        import pdfplumber
+        try:
+            with pdfplumber.open(path) as pdf:
+                parts.append((pdf.pages[0].extract_text() or "") if pdf.pages else "")
+        except Exception:
+            logging.exception("Не удалось прочитать текст первой страницы %s", path)
+    return "\n".join(parts)
+
+
+def detect_supplier(path, df=None):
+    """Ранжированные догадки [(supplier_id, уверенность)] по имени файла и его содержимому."""
+    detector = get_detector()
+    if not detector.matcher.words and not detector.regexes:
+        return []
+    return detector.detect(Path(path).stem, file_text(path, df))
+
+
+def confident_supplier(guesses):
+    """id поставщика, если лучшая догадка достаточно уверенная и однозначная, иначе None."""
+    if not guesses or guesses[0][1] < AUTO_CONFIDENCE:
+        return None
+    if len(guesses) > 1 and guesses[0][1] - guesses[1][1] < AUTO_MARGIN:
+        return None
+    return guesses[0][0]
@@ -1,27 +1,60 @@
 # pandas_model.py
 from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
+import numpy as np
 import pandas as pd
 
 class PandasModel(QAbstractTableModel):
+    """
+    Ленивая модель для больших таблиц:
+    - строки отдаются порциями по BATCH (canFetchMore/fetchMore);
+    - колонка форматируется в строки один раз при первом обращении и кэшируется;
+    - сортировка — перестановкой индексов, сам DataFrame не копируется.
+    """
+    BATCH = 1000
+
     def __init__(self, df=None, parent=None):
         super().__init__(parent)
         self._df = df.reset_index(drop=True) if df is not None else pd.DataFrame()
+        self._text = {}
+        self._order = None
+        self._loaded = min(self.BATCH, len(self._df.index))
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._df.index)
+        return 0 if parent.isValid() else self._loaded
 
     def columnCount(self, parent=QModelIndex()):
         return 0 if self._df.empty else len(self._df.columns)
 
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._df.index)
+
+    def fetchMore(self, parent=QModelIndex()):
+        n = min(self.BATCH, len(self._df.index) - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    def _column_text(self, col):
+        text = self._text.get(col)
+        if text is None:
+            s = self._df.iloc[:, col]
+            text = ["" if na else str(v) for v, na in zip(s.to_numpy(dtype=object), s.isna().to_numpy())]
+            self._text[col] = text
+        return text
+
+    def _source_row(self, row):
+        return row if self._order is None else int(self._order[row])
+
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
+        # вид запрашивает много ролей на ячейку — отсекаем их до любой другой работы
+        if role != Qt.DisplayRole or not index.isValid():
             return None
-        if role == Qt.DisplayRole:
-            val = self._df.iat[index.row(), index.column()]
-            if pd.isna(val):
-                return ""
-            return str(val)
-        return None
+        col = index.column()
+        text = self._text.get(col) or self._column_text(col)
+        row = index.row()
+        return text[row if self._order is None else self._order[row]]
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if role != Qt.DisplayRole:
@@ -29,4 +62,24 @@ class PandasModel(QAbstractTableModel):
         if orientation == Qt.Horizontal:
             return str(self._df.columns[section])
         else:
-            return str(section + 1)
+            return str(self._source_row(section) + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0 or column >= self.columnCount():
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        persistent_src = [self._source_row(i.row()) for i in persistent]
+        s = self._df.iloc[:, column]
+        ascending = order == Qt.AscendingOrder
+        try:
+            perm = s.reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last").index
+        except TypeError:
+            # смешанные типы в колонке — сортируем по отображаемому тексту
+            perm = pd.Series(self._column_text(column)).sort_values(ascending=ascending, kind="stable").index
+        self._order = np.asarray(perm, dtype=np.int64)
+        position = np.empty_like(self._order); position[self._order] = np.arange(len(self._order))
+        self.changePersistentIndexList(persistent, [
+            self.index(int(position[src]), i.column()) if position[src] < self._loaded else QModelIndex()
+            for i, src in zip(persistent, persistent_src)])
+        self.layoutChanged.emit()
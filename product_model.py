@@ -0,0 +1,53 @@
+# product_model.py
+from PySide6.QtCore import QAbstractListModel, Qt, QModelIndex
+
+class ProductListModel(QAbstractListModel):
+    """
+    Список "Мои товары" поверх каталога в памяти.
+    Поиск идёт по заранее подготовленному индексу "имя\\nкод" в нижнем регистре;
+    если новый запрос продолжает предыдущий, фильтруются только уже найденные строки.
+    """
+    def __init__(self, products=(), parent=None):
+        super().__init__(parent)
+        self._query = ""
+        self.set_products(products)
+
+    def set_products(self, products):
+        self.beginResetModel()
+        self._ids = []; self._labels = []; self._keys = []
+        for p in products:
+            code = p['code'] if "code" in p.keys() and p['code'] else ''
+            name = p['my_name']
+            self._ids.append(p['id'])
+            self._labels.append(f"{p['id']}: {name}" + (f" [{code}]" if code else ""))
+            self._keys.append(str(name).lower() + "\n" + str(code).lower())
+        self._rows = self._match(self._query, range(len(self._ids)))
+        self.endResetModel()
+
+    def _match(self, q, candidates):
+        if not q:
+            return list(candidates)
+        keys = self._keys
+        return [i for i in candidates if q in keys[i]]
+
+    def set_filter(self, text):
+        q = text.strip().lower()
+        if q == self._query:
+            return
+        narrowing = self._query and q.startswith(self._query)
+        rows = self._match(q, self._rows if narrowing else range(len(self._ids)))
+        self.beginResetModel()
+        self._query = q; self._rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._labels[self._rows[index.row()]]
+        if role == Qt.UserRole:
+            return self._ids[self._rows[index.row()]]
+        return None
@@ -5,9 +5,9 @@ QLabel { color: #0f172a; font-weight: 600; }
 QPushButton { background: #2563eb; color: white; border-radius:10px; padding:8px 12px; border: none; min-height: 34px; }
 QPushButton#excel { background: #22c55e; }
 QPushButton:hover { opacity: 0.95; }
-QListWidget { background: rgba(255,255,255,0.95); border: 1px solid rgba(230,233,242,0.9); border-radius:8px; padding:4px; }
-QListWidget::item { padding:8px; }
-QListWidget::item:selected { background: rgba(199,215,255,0.85); color: #0b1220; border-radius:6px; }
+QListWidget, QListView { background: rgba(255,255,255,0.95); border: 1px solid rgba(230,233,242,0.9); border-radius:8px; padding:4px; }
+QListWidget::item, QListView::item { padding:8px; }
+QListWidget::item:selected, QListView::item:selected { background: rgba(199,215,255,0.85); color: #0b1220; border-radius:6px; }
 QTableView { background: rgba(255,255,255,0.98); border: none; border-radius:8px; gridline-color: rgba(0,0,0,0.04); }
 QHeaderView::section { background: transparent; padding:8px; font-weight:600; }
 QLineEdit { background: rgba(255,255,255,0.98); border: 1px solid rgba(230,233,242,0.95); padding:8px; border-radius:8px; }
@@ -0,0 +1,27 @@
+# conftest.py
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path, monkeypatch):
+    """Кэш разобранных файлов — во временной папке, а не в cache/ рядом с кодом."""
+    import logic_import
+    monkeypatch.setattr(logic_import, "CACHE_DIR", tmp_path / "cache")
+    return logic_import.CACHE_DIR
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Пустая база во временной папке вместо database.db (бэкапы — тоже там); соединение потока переоткрывается."""
+    import db
+    db.close_connection()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(db, "BACKUP_DIR", tmp_path / "backup")
+    monkeypatch.setattr(db, "_startup_backup_done", False)
+    db.init_db()
+    yield db
+    db.close_connection()
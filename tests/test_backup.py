@@ -0,0 +1,51 @@
+# test_backup.py
+from datetime import datetime, timedelta
+import pytest
+import backup
+
+
+def product_names(db):
+    return [r["my_name"] for r in db.connection().execute("SELECT my_name FROM my_products ORDER BY id")]
+
+
+def test_gzip_backup_round_trip(temp_db):
+    temp_db.add_my_product("До бэкапа")
+    path = backup.create_backup(compress=True)
+    assert path.name.endswith(".sqlite.gz") and path.parent == temp_db.BACKUP_DIR
+    temp_db.add_my_product("После бэкапа")
+
+    safety = backup.restore_backup(path)
+    assert product_names(temp_db) == ["До бэкапа"]
+    assert backup.check_integrity(safety) == "ok"  # состояние перед восстановлением сохранено
+    backup.restore_backup(safety)
+    assert product_names(temp_db) == ["До бэкапа", "После бэкапа"]
+
+
+def test_restore_rejects_damaged_backup(temp_db):
+    temp_db.add_my_product("Товар")
+    path = backup.create_backup()
+    data = bytearray(path.read_bytes())
+    data[4096:8192] = b"\xff" * 4096  # затираем вторую страницу
+    path.write_bytes(bytes(data))
+    assert backup.check_integrity(path) != "ok"
+    with pytest.raises(ValueError):
+        backup.restore_backup(path)
+    assert product_names(temp_db) == ["Товар"]
+    assert len(backup.list_backups()) == 1  # бэкап текущей базы не делался: до замены не дошло
+
+
+def test_retention_keeps_last_daily_and_weekly(tmp_path):
+    start = datetime(2026, 3, 31, 18)  # вторник
+    names = {}
+    for d in range(30):
+        for hour in (18, 9):
+            when = start.replace(hour=hour) - timedelta(days=d)
+            p = tmp_path / f"{when:db_%Y%m%d%H%M%S}.sqlite"; p.write_bytes(b"")
+            names[when] = p.name
+    backup.apply_retention(tmp_path)
+    kept = {p.name for p, _, _ in backup.list_backups(tmp_path)}
+    expected = {names[datetime(2026, 3, 31, 9)]}                              # 3 последних: 31.03 18:00 и 09:00, 30.03 18:00
+    expected |= {names[datetime(2026, 3, day, 18)] for day in range(25, 32)}  # самый свежий за каждый из 7 дней
+    expected |= {names[datetime(2026, 3, 22, 18)], names[datetime(2026, 3, 15, 18)]}  # и за каждую из 4 недель
+    assert kept == expected
+    assert len(kept) <= backup.KEEP_LAST + backup.KEEP_DAILY + backup.KEEP_WEEKLY
@@ -0,0 +1,52 @@
+# test_db.py
+import re
+import pytest
+from db import HOT_QUERIES
+
+HOT_TABLES = ("my_products", "product_mappings", "price_history")
+
+
+def query_plan(db, sql, params):
+    return [row["detail"] for row in db.connection().execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def test_migrations_bring_schema_to_latest_version(temp_db):
+    version = temp_db.connection().execute("PRAGMA user_version").fetchone()[0]
+    assert version == temp_db.MIGRATIONS[-1][0]
+    temp_db.init_db()  # повторный запуск ничего не ломает
+    assert temp_db.connection().execute("PRAGMA user_version").fetchone()[0] == version
+
+
+def test_pending_migration_is_preceded_by_backup(temp_db, monkeypatch):
+    import backup, sqlite3
+    assert backup.list_backups() == [] and temp_db.startup_backup_needed()  # новой пустой базе бэкап не нужен
+    temp_db.add_my_product("Товар")
+    latest = temp_db.MIGRATIONS[-1][0]
+    monkeypatch.setattr(temp_db, "MIGRATIONS", temp_db.MIGRATIONS + [(latest + 1, lambda cur: cur.execute("CREATE TABLE probe (x)"))])
+    temp_db.init_db()
+    (path, _, _), = backup.list_backups()
+    copy = sqlite3.connect(path)
+    try:
+        # копия снята до миграции: старая версия схемы, данные на месте
+        assert copy.execute("PRAGMA user_version").fetchone()[0] == latest
+        assert copy.execute("SELECT my_name FROM my_products").fetchall() == [("Товар",)]
+        assert copy.execute("SELECT 1 FROM sqlite_master WHERE name = 'probe'").fetchone() is None
+    finally:
+        copy.close()
+    assert not temp_db.startup_backup_needed()
+    temp_db.init_db()
+    assert len(backup.list_backups()) == 1
+
+
+@pytest.mark.parametrize("sql, params", HOT_QUERIES, ids=[sql for sql, _ in HOT_QUERIES])
+def test_hot_query_uses_index(temp_db, sql, params):
+    plan = query_plan(temp_db, sql, params)
+    for detail in plan:
+        for table in HOT_TABLES:
+            # и «SCAN t USING INDEX» — тоже просмотр всей таблицы, только в порядке индекса
+            assert not re.match(rf"SCAN {table}\b", detail), (sql, plan)
+        assert "TEMP B-TREE" not in detail, (sql, plan)
+
+
+def test_full_scans_reports_nothing(temp_db):
+    assert temp_db.full_scans() == []
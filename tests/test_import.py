@@ -0,0 +1,120 @@
+# test_import.py
+import shutil
+import openpyxl
+import pandas as pd
+import logic_import
+
+
+def write_xlsx(path, rows):
+    wb = openpyxl.Workbook(); ws = wb.active
+    for r, row in enumerate(rows, start=1):
+        for c, value in enumerate(row, start=1):
+            ws.cell(r, c, value)
+    wb.save(path)
+    return path
+
+
+def test_excel_chunks_skip_leading_blank_rows(tmp_path):
+    path = write_xlsx(tmp_path / "inv.xlsx", [[], [], ["Наименование", "Кол-во", "Цена"], ["Товар", 2, "10,50"], ["Товар 2", 1, 3]])
+    chunks = list(logic_import.iter_excel_chunks(path))
+    assert len(chunks) == 1
+    assert list(chunks[0].columns) == ["Наименование", "Кол-во", "Цена"]
+    assert chunks[0]["Наименование"].tolist() == ["Товар", "Товар 2"]
+    head = logic_import.read_supplier_head(path)
+    proc = logic_import.prepare_supplier_file(path, logic_import.map_columns_by_keywords(head))
+    assert proc["price"].tolist() == [10.5, 3.0]
+
+
+def test_excel_chunks_blank_sheet_yields_one_empty_frame(tmp_path):
+    path = write_xlsx(tmp_path / "empty.xlsx", [])
+    chunks = list(logic_import.iter_excel_chunks(path))
+    assert len(chunks) == 1 and chunks[0].empty and len(chunks[0].columns) == 0
+    assert logic_import.read_supplier_head(path).empty
+
+
+# Очистка до CleaningPipeline (apply по строкам, пять проходов str.replace) — эталон для сравнения
+def reference_prepare(df, mapping):
+    proc = pd.DataFrame()
+    for file_col, logical in mapping.items():
+        if file_col in df.columns and logical in ("name", "qty", "price", "sum"):
+            proc[logical] = df[file_col]
+    proc = proc.dropna(how="all").drop_duplicates()
+    first_col = proc.columns[0]
+    is_header = proc[first_col].apply(lambda v: isinstance(v, str) and any(w in v.lower() for w in ["наим", "кол", "цена", "ед", "сум"]))
+    proc = proc[~is_header]
+    proc[first_col] = proc[first_col].astype(str).apply(lambda x: x.strip())
+    for c in ("qty", "price", "sum"):
+        if c in proc.columns:
+            proc[c] = proc[c].astype(str).str.replace('\xa0', '').str.replace(' ', '')
+            proc[c] = proc[c].str.replace(r'[^\d\.,\-]', '', regex=True).str.replace(',', '.')
+            proc[c] = pd.to_numeric(proc[c], errors='coerce').fillna(0)
+        else:
+            proc[c] = 0.0
+    return proc.reset_index(drop=True)
+
+
+def invoice_rows(n=600):
+    rows = [["Наименование", "Кол-во", "Цена, руб", "Сумма"]]
+    for i in range(n):
+        if i % 97 == 0:
+            rows.append(["Наименование товара", "Кол.", "Цена", "Сумма"])  # повтор заголовка на новой странице
+        elif i % 89 == 0:
+            rows.append([None, None, None, None])
+        else:
+            price = f"{i % 50}\xa0{i % 1000:03d},{i % 100:02d}" if i % 3 else round(i * 1.25, 2)
+            rows.append([f"  Товар {i % 250}\xa0", i % 7 if i % 5 else f"{i % 7} шт", price, f"{i * 3} руб."])
+    rows.append(["ИТОГО", None, None, "12 345,00"])
+    return rows
+
+
+def assert_identical(a, b):
+    pd.testing.assert_frame_equal(a, b, check_exact=True)
+    assert list(a.dtypes) == list(b.dtypes)
+
+
+def test_cleaning_pipeline_matches_reference(tmp_path, parse_cache):
+    rows = invoice_rows()
+    frame = pd.DataFrame(rows[1:], columns=rows[0], dtype=object)
+    mapping = logic_import.map_columns_by_keywords(frame)
+    for df in (frame, frame.astype({"Наименование": "str", "Сумма": "str"})):
+        assert_identical(logic_import.prepare_supplier_df(df.copy(), mapping), reference_prepare(df.copy(), mapping))
+
+    path = write_xlsx(tmp_path / "invoice.xlsx", rows)
+    expected = reference_prepare(pd.read_excel(path), mapping)
+    for chunk_rows in (50, 1000):  # повторы и дубли попадают в разные порции
+        shutil.rmtree(parse_cache, ignore_errors=True)
+        assert_identical(logic_import.prepare_supplier_file(path, mapping, chunk_rows=chunk_rows), expected)
+
+
+def test_cleaned_frame_is_cached_by_content_and_mapping(tmp_path, parse_cache, monkeypatch):
+    rows = invoice_rows(200)
+    path = write_xlsx(tmp_path / "invoice.xlsx", rows)
+    mapping = logic_import.map_columns_by_keywords(logic_import.read_supplier_head(path))
+    head = logic_import.read_supplier_head(path)
+    first = logic_import.prepare_supplier_file(path, mapping)
+    assert len(list(parse_cache.iterdir())) == 2  # заголовок и очищенные данные
+
+    def no_read(*a, **k):
+        raise AssertionError("файл прочитан повторно")
+    with monkeypatch.context() as m:
+        m.setattr(logic_import, "iter_excel_chunks", no_read)
+        assert_identical(logic_import.read_supplier_head(path), head)
+        assert_identical(logic_import.prepare_supplier_file(path, mapping), first)
+
+    # другое сопоставление или другое содержимое — другой ключ
+    other = {c: (None if l == "sum" else l) for c, l in mapping.items()}
+    assert (logic_import.prepare_supplier_file(path, other)["sum"] == 0).all()
+    write_xlsx(path, rows[:50])
+    assert len(logic_import.prepare_supplier_file(path, mapping)) < len(first)
+
+
+def test_chunked_dedupe_compares_rows_not_hashes():
+    class Collide:
+        """Разные значения с одинаковым хэшем."""
+        def __init__(self, v): self.v = v
+        def __hash__(self): return 1
+        def __eq__(self, other): return isinstance(other, Collide) and self.v == other.v
+    pipeline = logic_import.CleaningPipeline({})
+    pipeline._seen = set()
+    df = pd.DataFrame({"name": [Collide(1), Collide(2), Collide(1)]}, dtype=object)
+    assert pipeline._dedupe(df)["name"].map(lambda c: c.v).tolist() == [1, 2]
@@ -0,0 +1,49 @@
+# test_mapping.py
+import pandas as pd
+import pytest
+import logic_mapping
+from logic_mapping import resolve_mapping, remember_mapping
+
+
+@pytest.fixture
+def supplier(temp_db):
+    logic_mapping._cache.clear()  # кэш живёт в модуле, а база у каждого теста своя
+    yield temp_db.add_supplier("Поставщик")
+    logic_mapping._cache.clear()
+
+
+def frame(columns):
+    return pd.DataFrame([["Товар", 1, 10, 10][:len(columns)]], columns=columns)
+
+
+def test_keyword_header_is_not_saved_on_second_open(supplier):
+    remember_mapping(supplier, ["Артикул", "Товар поставщика"], {"Товар поставщика": "name"})
+    df = frame(["Товар поставщика", "Количество", "Цена", "Сумма"])
+    expected = {"Товар поставщика": "name", "Количество": "qty", "Цена": "price", "Сумма": "sum"}
+    for _ in range(2):
+        mapping, source = resolve_mapping(df, supplier)
+        assert source == "keywords"
+        assert mapping == expected
+
+
+def test_remembered_header_is_saved(supplier):
+    columns = ["Товар", "Кол", "Стоимость", "Примечание"]
+    remember_mapping(supplier, columns, {"Товар": "name", "Кол": "qty", "Стоимость": "price"})
+    logic_mapping._cache.clear()
+    mapping, source = resolve_mapping(frame(columns), supplier)
+    assert source == "saved"
+    assert mapping == {"Товар": "name", "Кол": "qty", "Стоимость": "price", "Примечание": None}
+
+
+def test_saved_header_ignores_case_and_spaces(supplier):
+    remember_mapping(supplier, ["Товар", "Кол"], {"Товар": "name", "Кол": "qty"})
+    logic_mapping._cache.clear()
+    mapping, source = resolve_mapping(frame([" товар ", "КОЛ"]), supplier)
+    assert source == "saved"
+    assert mapping == {" товар ": "name", "КОЛ": "qty"}
+
+
+def test_header_mappings_are_per_supplier(supplier, temp_db):
+    other = temp_db.add_supplier("Другой")
+    remember_mapping(supplier, ["Товар", "Кол"], {"Товар": "name", "Кол": "qty"})
+    assert resolve_mapping(frame(["Товар", "Кол"]), other)[1] == "keywords"
@@ -0,0 +1,58 @@
+# test_match_candidates.py
+import random
+import pytest
+import logic_matching
+from logic_matching import refresh_match_candidates, top_k_matches
+from logic_products import get_catalog
+
+WORDS = ["молоко", "кефир", "сыр", "масло", "хлеб", "сок", "вода", "чай", "кофе", "сахар"]
+BRANDS = ["простоквашино", "агуша", "lipton", "макфа", "добрый", "danone"]
+SIZES = ["1л", "0.5л", "200г", "1кг", "3.2%"]
+
+
+def full_recompute(names, k=logic_matching.MATCH_TOP_K):
+    """Эталон: top_k_matches по всему текущему каталогу."""
+    records = get_catalog().records
+    tops = top_k_matches(names, [r.my_name for r in records], k=k)
+    return {n: [(records[j].id, score) for j, score in top] for n, top in zip(names, tops)}
+
+
+@pytest.fixture
+def catalogue(temp_db):
+    rng = random.Random(3)
+    for i in range(300):
+        temp_db.add_my_product(f"{rng.choice(WORDS)} {rng.choice(BRANDS)} {rng.choice(SIZES)}", code=f"C{i}")
+    return temp_db
+
+
+def test_incremental_refresh_equals_full_recompute(catalogue, monkeypatch):
+    db = catalogue
+    sid = db.add_supplier("Поставщик")
+    rng = random.Random(5)
+    names = [f"{rng.choice(WORDS)} {rng.choice(BRANDS)} {rng.choice(SIZES)}" for _ in range(60)] + ["что-то совсем другое"]
+    assert refresh_match_candidates(sid, names) == full_recompute(names)
+
+    scored = []
+    orig = logic_matching.top_k_matches
+    monkeypatch.setattr(logic_matching, "top_k_matches", lambda q, c, **kw: scored.append((len(q), len(c))) or orig(q, c, **kw))
+    assert refresh_match_candidates(sid, names) == full_recompute(names)
+    assert scored == []  # каталог не менялся — всё из match_candidates
+
+    first = refresh_match_candidates(sid, names)
+    stored_ids = {mid for cands in first.values() for mid, _ in cands}
+    unused = [r.id for r in get_catalog().records if r.id not in stored_ids]
+
+    mutations = [
+        lambda: db.add_my_product(names[0].upper() + " новинка"),            # новый товар — лучший кандидат
+        lambda: db.add_my_product("совершенно посторонний товар"),
+        lambda: db.update_my_product(unused[0], name=names[1]),              # переименование не-кандидата
+        lambda: db.update_my_product(next(iter(stored_ids)), name="переименованный товар"),  # переименование кандидата
+        lambda: db.delete_my_product(sorted(stored_ids)[-1]),                # удаление кандидата
+        lambda: db.update_my_product(unused[1], code="X1"),                  # код не меняет ревизию имени
+    ]
+    for i, mutate in enumerate(mutations):
+        mutate()
+        scored.clear()
+        assert refresh_match_candidates(sid, names) == full_recompute(names), i
+        if i == 0:
+            assert scored == [(len(set(names)), 1)]  # все имена — только против добавленного товара
@@ -0,0 +1,66 @@
+# test_matching.py
+import random
+import logic_matching
+from logic_matching import CandidateIndex, similarity, top_k_matches
+
+FLAVOURS = ["Вишня на коньяке", "Джин", "Кедровка", "Лимончелло", "Бейлис", "Перцовка", "Клюковка", "Старка"]
+WORDS = ["молоко", "кефир", "сыр", "масло", "хлеб", "сок", "вода", "чай", "кофе", "дрожжи", "сахар", "мука"]
+BRANDS = ["простоквашино", "агуша", "lipton", "макфа", "добрый", "мираторг", "danone"]
+SIZES = ["1л", "0.5л", "200г", "1кг", "330мл", "3.2%"]
+
+
+def catalogue(n=1500, seed=7):
+    """Синтетический каталог с группами почти одинаковых названий — на них при оценке 100 много равных."""
+    rng = random.Random(seed)
+    names = [f"{rng.choice(WORDS)} {rng.choice(BRANDS)} {rng.choice(SIZES)} {i % 97}" for i in range(n)]
+    for i in range(0, n, 17):
+        names[i] = f"Набор Алхимия вкуса {rng.choice(FLAVOURS)} {i}"
+    for i in range(5, n, 41):
+        names[i] = f"Дрожжи {rng.choice(BRANDS)} {rng.choice(SIZES)}"
+    return names
+
+
+def queries(products, n=400, seed=11):
+    rng = random.Random(seed)
+    out = ["НАБОР АЛХИМИЯ", "Набор Алхимия вкуса", "ДРОЖЖИ", "дрожжи макфа"]
+    for name in rng.choices(products, k=n):
+        words = name.split()
+        if rng.random() < 0.4:
+            words = words[:max(1, len(words) - rng.randint(1, 3))]
+        elif rng.random() < 0.3:
+            rng.shuffle(words)
+        s = " ".join(words)
+        out.append(s.upper() if rng.random() < 0.4 else s)
+    return out
+
+
+def brute_force(text, products):
+    """Полный перебор каталога: (позиция, балл) лучшего, при равных — первый по каталогу."""
+    best = (None, 0)
+    for pos, name in enumerate(products):
+        sc = similarity(str(text).lower(), name.lower())
+        if sc > best[1]:
+            best = (pos, float(sc))
+    return best
+
+
+def test_fallback_top_match_equals_brute_force_above_threshold(monkeypatch):
+    monkeypatch.setattr(logic_matching, "process", None)  # путь без rapidfuzz — через CandidateIndex
+    products = catalogue()
+    qs = queries(products)
+    for q, top in zip(qs, top_k_matches(qs, products, k=1)):
+        expected = brute_force(q, products)
+        if expected[1] >= 85:
+            assert top == [expected], q
+
+
+def test_ties_go_to_first_product_in_catalogue():
+    products = catalogue()
+    first = next(i for i, name in enumerate(products) if name.startswith("Набор Алхимия"))
+    assert CandidateIndex(products).top_k("НАБОР АЛХИМИЯ") == [(first, 100.0)]
+
+
+def test_small_catalogue_is_scored_in_full():
+    products = catalogue(30)
+    index = CandidateIndex(products)
+    assert index.candidates("что угодно") == list(range(30))
@@ -0,0 +1,47 @@
+# test_price.py
+import threading
+from logic_price import price_change_report, record_prices
+
+
+def add_history(db, rows):
+    with db.transaction() as cur:
+        cur.executemany("INSERT INTO price_history (product_id, price) VALUES (?, ?)", rows)
+
+
+def test_price_change_report_reads_one_snapshot(temp_db):
+    with temp_db.transaction() as cur:
+        cur.executemany("INSERT INTO my_products (my_name) VALUES (?)", [(f"товар {i}",) for i in range(10)])
+    add_history(temp_db, [(pid, price) for pid in range(1, 6) for price in (10.0, 11.0, 12.0)])
+
+    def write_from_other_thread():
+        add_history(temp_db, [(10, 5.0), (10, 6.0)])
+        temp_db.close_connection()
+
+    def on_statement(sql):
+        # фоновая запись (импорт, экспорт) между запросами отчёта: товар с product_id больше прежнего максимума
+        if sql.startswith("SELECT product_id, id, price"):
+            t = threading.Thread(target=write_from_other_thread); t.start(); t.join()
+
+    temp_db.connection().set_trace_callback(on_statement)
+    try:
+        report = price_change_report(chunk_size=4)
+    finally:
+        temp_db.connection().set_trace_callback(None)
+    assert report['product_id'].tolist() == [1, 2, 3, 4, 5]
+    assert report['last_price'].tolist() == [12.0] * 5
+    assert price_change_report()['product_id'].tolist() == [1, 2, 3, 4, 5, 10]
+
+
+def test_price_summary_from_rollups_matches_history(temp_db):
+    with temp_db.transaction() as cur:
+        cur.executemany("INSERT INTO my_products (my_name) VALUES (?)", [(f"товар {i}",) for i in range(3)])
+    temp_db.add_price_history(1, 9.0, "2026-01-15 10:00:00")
+    for prices in ([(1, 10.0), (2, 5.0)], [(1, 12.5), (2, 5.0)], [(1, 11.0), (2, 4.0)]):
+        record_prices(prices)
+    for pid in (1, 2):
+        history = [r["price"] for r in temp_db.get_price_history_for_product(pid)]
+        summary = temp_db.get_price_summary(pid)
+        assert summary["count"] == len(history)
+        assert (summary["min"], summary["max"]) == (min(history), max(history))
+        assert abs(summary["avg"] - sum(history) / len(history)) < 1e-9
+    assert temp_db.get_price_summary(3) is None
@@ -0,0 +1,66 @@
+# test_suppliers.py
+import random
+import re
+from logic_suppliers import SupplierDetector, MATCH_WEIGHTS, split_patterns, is_regex, regex_body, pattern_errors
+from text_utils import normalize_name
+
+WORDS = ["ромашка", "ром", "машка", "оптторг", "опт", "торг", "ооо", "ип", "иванов", "и.и.", "ии", "7701234567",
+         "770123", "молоко", "коко", "мол", "(опт)", "счёт", "накладная", "№", "12", "-", "поставка"]
+
+
+def whole_word(text, word):
+    start = text.find(word)
+    while start >= 0:
+        end = start + len(word)
+        if not (start > 0 and text[start - 1].isalnum() and text[start].isalnum()) and \
+           not (end < len(text) and text[end].isalnum() and text[end - 1].isalnum()):
+            return True
+        start = text.find(word, start + 1)
+    return False
+
+
+def naive_detect(suppliers, filename, content):
+    """Эталон: каждый шаблон каждого поставщика ищется в тексте отдельно."""
+    miss = {}
+    for source, text in (("filename", filename), ("content", content)):
+        found = {}
+        for sid, patterns in suppliers:
+            for p in split_patterns(patterns):
+                if is_regex(p):
+                    if re.search(regex_body(p), text, re.IGNORECASE):
+                        found.setdefault(("re", regex_body(p)), set()).add(sid)
+                elif normalize_name(p) and whole_word(normalize_name(text), normalize_name(p)):
+                    found.setdefault(("lit", normalize_name(p)), set()).add(sid)
+        for owners in found.values():
+            for sid in owners:
+                miss[sid] = miss.get(sid, 1.0) * (1 - MATCH_WEIGHTS[source] / len(owners))
+    return sorted(((sid, round(1 - m, 3)) for sid, m in miss.items()), key=lambda g: (-g[1], g[0]))
+
+
+def test_detector_matches_naive_scan():
+    rng = random.Random(4)
+    regexes = [r"re:ИНН\s*77\d+", r"re:^счёт\b", "re:ром.шка"]
+    for _ in range(200):
+        suppliers = []
+        for sid in range(1, rng.randint(2, 8)):
+            patterns = [" ".join(rng.choices(WORDS, k=rng.randint(1, 3))) for _ in range(rng.randint(1, 3))]
+            if rng.random() < 0.3:
+                patterns.append(rng.choice(regexes))
+            suppliers.append((sid, "\n".join(patterns)))
+        filename = "_".join(rng.choices(WORDS, k=3))
+        content = " ".join(rng.choices(WORDS + ["ИНН 7701", "ИНН7700"], k=rng.randint(0, 30)))
+        assert SupplierDetector(suppliers).detect(filename, content) == naive_detect(suppliers, filename, content)
+
+
+def test_dots_and_brackets_are_literal_without_prefix():
+    detector = SupplierDetector([(1, "ИП Иванов И.И."), (2, "ООО Ромашка (опт)"), (3, r"re:ИНН\s*7701")])
+    assert detector.detect("", "Поставщик: ИП Иванов И.И., г. Москва") == [(1, 0.8)]
+    assert detector.detect("", "ИП Иванов ИXИX") == []  # точка — не любой символ
+    assert detector.detect("ООО_Ромашка_(опт)_счёт_12", "") == [(2, 0.6)]
+    assert detector.detect("", "ИНН  7701234567") == [(3, 0.8)]
+    assert not detector.regexes[1:] and len(detector.matcher.words) == 2
+
+
+def test_pattern_errors_only_for_prefixed_patterns():
+    assert pattern_errors("ООО Ромашка (опт\nИП Иванов И.И.") == []
+    assert [p for p, _ in pattern_errors("re:ООО (опт\nre:")] == ["re:ООО (опт", "re:"]
@@ -0,0 +1,23 @@
+# text_utils.py
+import re
+import hashlib
+
+_NON_WORD = re.compile(r'[^0-9a-zа-яё\.,\-]+')
+_SPACES = re.compile(r'\s+')
+
+def normalize_name(s: str) -> str:
+    if s is None:
+        return ""
+    s = str(s).lower()
+    s = _NON_WORD.sub(' ', s)
+    s = _SPACES.sub(' ', s).strip()
+    return s
+
+def header_key(column) -> str:
+    """Имя колонки без учёта регистра и лишних пробелов."""
+    return _SPACES.sub(' ', str(column)).strip().lower()
+
+def header_fingerprint(columns) -> str:
+    """Отпечаток строки заголовков файла: порядок колонок важен, регистр и лишние пробелы — нет."""
+    text = "||".join(header_key(c) for c in columns)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -1,24 +1,20 @@
 # ui_main.py
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QLineEdit, QFileDialog, QMessageBox, QListWidgetItem, QTableView
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QListView, QLineEdit, QFileDialog, QMessageBox, QTableView, QProgressBar
+from PySide6.QtCore import Qt, QTimer
 from pathlib import Path
-import pandas as pd
 from styles import BASE_STYLE
-from db import get_all_products, add_supplier, get_suppliers, get_product_mapping, save_product_mapping, add_supplier_file_history, get_connection, init_db
-from logic_products import ensure_code_column, import_products_from_df, dedupe_my_products_by_code_and_name
-from logic_import import read_supplier_file, map_columns_by_keywords, clean_supplier_df
-from logic_export import build_final_table, save_to_excel
-from logic_price import record_price_if_changed
-from ui_matcher import ProductMatchingWindow
+from db import add_supplier, get_suppliers, get_product_mappings_bulk, save_product_mapping, add_supplier_file_history, rotate_backups, startup_backup_needed
+from logic_products import get_catalog
 from ui_supplier_manager import SupplierManagerDialog
-from ui_product_info import ProductInfoDialog
-from pandas_model import PandasModel
+from product_model import ProductListModel
+from jobs import start_job, start_background_job
+
+# pandas, pdfplumber, rapidfuzz и QtCharts импортируются при первом использовании (в методах и задачах ниже),
+# чтобы окно появлялось сразу; после показа окна они подгружаются в фоне (_startup_job)
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        ensure_code_column()
-        init_db()
         self.setWindowTitle("Importer — Modern")
         self.resize(1250, 780)
         central = QWidget(); self.setCentralWidget(central); layout = QVBoxLayout(central)
@@ -28,6 +24,7 @@ class MainWindow(QMainWindow):
         btn_open = QPushButton("Открыть Excel/PDF"); btn_open.clicked.connect(self.open_file); top.addWidget(btn_open)
         btn_suppliers = QPushButton("Управление поставщиками"); btn_suppliers.clicked.connect(self.manage_suppliers); top.addWidget(btn_suppliers)
         btn_match = QPushButton("Сопоставление товаров"); btn_match.clicked.connect(self.open_matcher_window); top.addWidget(btn_match)
+        btn_report = QPushButton("Отчёт по ценам"); btn_report.clicked.connect(self.open_price_report); top.addWidget(btn_report)
         self.lbl_info = QLabel("Файл: не выбран"); top.addWidget(self.lbl_info); top.addStretch()
         layout.addLayout(top)
 
@@ -37,8 +34,10 @@ class MainWindow(QMainWindow):
         # Left: my products
         left = QVBoxLayout()
         left.addWidget(QLabel("Мои товары:"))
-        self.search_box = QLineEdit(); self.search_box.setPlaceholderText("Поиск..."); self.search_box.textChanged.connect(self.load_my_products); left.addWidget(self.search_box)
-        self.my_products_list = QListWidget(); self.my_products_list.setAlternatingRowColors(True); self.my_products_list.itemDoubleClicked.connect(self.open_product_info_from_item); left.addWidget(self.my_products_list)
+        self.search_timer = QTimer(self); self.search_timer.setSingleShot(True); self.search_timer.setInterval(200); self.search_timer.timeout.connect(self.apply_product_filter)
+        self.search_box = QLineEdit(); self.search_box.setPlaceholderText("Поиск..."); self.search_box.textChanged.connect(self.schedule_product_filter); left.addWidget(self.search_box)
+        self.my_products_model = ProductListModel(parent=self)
+        self.my_products_list = QListView(); self.my_products_list.setModel(self.my_products_model); self.my_products_list.setUniformItemSizes(True); self.my_products_list.setAlternatingRowColors(True); self.my_products_list.doubleClicked.connect(self.open_product_info_from_item); left.addWidget(self.my_products_list)
         btns = QHBoxLayout()
         btn_import = QPushButton("Импорт моих товаров (Excel)"); btn_import.clicked.connect(self.import_my_products); btns.addWidget(btn_import)
         btn_info = QPushButton("Информация о товаре"); btn_info.clicked.connect(self.open_product_info_selected); btns.addWidget(btn_info)
@@ -47,7 +46,7 @@ class MainWindow(QMainWindow):
 
         # Center: preview
         center = QVBoxLayout(); center.addWidget(QLabel("Предпросмотр (Наименование, Цена, шт, Сумма)"))
-        self.table = QTableView(); self.table.setAlternatingRowColors(True); center.addWidget(self.table); middle.addLayout(center,3)
+        self.table = QTableView(); self.table.setAlternatingRowColors(True); self.table.setSortingEnabled(True); self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder); center.addWidget(self.table); middle.addLayout(center,3)
 
         # Right: columns and mapping
         right = QVBoxLayout(); right.addWidget(QLabel("Колонки файла:")); self.columns_list = QListWidget(); self.columns_list.setAlternatingRowColors(True); right.addWidget(self.columns_list)
@@ -57,129 +56,271 @@ class MainWindow(QMainWindow):
         self.btn_export = QPushButton("Сформировать итоговый Excel"); self.btn_export.setProperty("id","excel"); self.btn_export.setStyleSheet("background: #22c55e; color: white; padding:8px; border-radius:8px;"); self.btn_export.clicked.connect(self.generate_final); layout.addWidget(self.btn_export)
         self.setStyleSheet(BASE_STYLE)
 
-        self.current_df = pd.DataFrame(); self.current_processed_df = pd.DataFrame(); self.current_supplier_id = None
+        # Status bar: progress of background jobs
+        self.progress = QProgressBar(); self.progress.setRange(0,100); self.progress.setMaximumWidth(260); self.progress.hide()
+        self.btn_cancel = QPushButton("Отмена"); self.btn_cancel.clicked.connect(self.cancel_job); self.btn_cancel.hide()
+        self.statusBar().addPermanentWidget(self.progress); self.statusBar().addPermanentWidget(self.btn_cancel)
+        self.current_job = None
+        self.candidates_job = None; self.matcher_pending = False
+
+        self.current_path = None; self.current_df = None; self.current_processed_df = None; self.current_supplier_id = None; self.current_mapping = None
         self.load_my_products()
 
+    def start_background_tasks(self):
+        # не через run_job: фоновая служебная задача не занимает слот пользовательских операций
+        self.startup_job = start_job(_startup_job)
+
     def load_my_products(self):
-        self.my_products_list.clear(); q=self.search_box.text().strip().lower()
-        for r in get_all_products():
-            code = r['code'] if "code" in r.keys() and r['code'] else ''
-            name = r['my_name']
-            if q=="" or q in name.lower() or (code and q in str(code).lower()):
-                item = QListWidgetItem(f"{r['id']}: {name}" + (f" [{code}]" if code else "")); item.setData(Qt.UserRole, r['id']); self.my_products_list.addItem(item)
+        self.my_products_model.set_products(get_catalog().records)
+
+    def schedule_product_filter(self, _text=None):
+        # метод, а не lambda с self: такое замыкание мешает PySide корректно удалить окно при выходе
+        self.search_timer.start()
+
+    def apply_product_filter(self):
+        self.my_products_model.set_filter(self.search_box.text())
 
     def import_my_products(self):
         path, _ = QFileDialog.getOpenFileName(self, "Выберите Excel с кодами", str(Path.home()), "Excel Files (*.xlsx *.xls)")
         if not path: return
-        try:
-            df = pd.read_excel(path, dtype=str)
-        except Exception as e:
-            QMessageBox.critical(self,"Ошибка", str(e)); return
-        cols_lower = [str(c).lower() for c in df.columns]; col_code=None; col_name=None
-        for i,c in enumerate(cols_lower):
-            if any(k in c for k in ("код","code","артикул","sku","id")) and col_code is None: col_code = df.columns[i]
-            if any(k in c for k in ("наимен","name","товар")) and col_name is None: col_name = df.columns[i]
-        if not col_code or not col_name:
-            QMessageBox.warning(self,"Ошибка","Файл должен содержать колонки Код и Наименование."); return
-        df2 = df[[col_code, col_name]].rename(columns={col_code:"code", col_name:"name"}).dropna(subset=["code","name"])
-        res = import_products_from_df(df2, replace_all=False)
+        self.run_job(_import_products_job, path, on_result=self._on_products_imported, text="Импорт товаров...")
+
+    def _on_products_imported(self, res):
         QMessageBox.information(self,"Импорт", f"Добавлено: {res['added']}, Обновлено: {res['updated']}")
         self.load_my_products()
 
     def open_file(self):
         path, _ = QFileDialog.getOpenFileName(self,"Выберите файл поставщика", str(Path.home()), "Excel Files (*.xlsx *.xls);;PDF Files (*.pdf)")
         if not path: return
+        # current_path и подпись меняются только в _on_file_read: задачу могут отклонить или отменить
+        self.run_job(_read_file_job, path, on_result=self._on_file_read, text="Чтение файла...")
+
+    def _on_file_read(self, res):
+        path, df, guesses = res
         self.current_path = path; self.lbl_info.setText(f"Файл: {Path(path).name}")
-        try:
-            df = read_supplier_file(path)
-        except Exception as e:
-            QMessageBox.critical(self,"Ошибка чтения", str(e)); return
-        df.columns = [str(c).strip() for c in df.columns]; self.current_df = df.copy(); self.columns_list.clear()
+        page_errors = df.attrs.get('page_errors')
+        if page_errors:
+            QMessageBox.warning(self,"PDF", "Не удалось прочитать страницы: " + ", ".join(str(p) for p, _ in page_errors))
+        self.current_df = df.copy(); self.current_mapping = None; self.columns_list.clear()
         for c in df.columns: self.columns_list.addItem(c)
-        suppliers = get_suppliers()
+        sid = self.choose_supplier(guesses)
+        if sid is None: return
+        self.current_supplier_id = sid
+        from logic_mapping import resolve_mapping
+        mapping, source = resolve_mapping(df, self.current_supplier_id)
+        add_supplier_file_history(self.current_supplier_id, Path(path).name, list(df.columns))
+        self.apply_mapping(mapping, "сохранённое" if source == "saved" else "по ключевым словам")
+
+    def choose_supplier(self, guesses):
+        """Поставщик файла: без вопроса, если он уверенно определён по шаблонам (logic_suppliers), иначе — выбор с подсказкой."""
+        from logic_suppliers import confident_supplier
+        suppliers = get_suppliers(); confidence = dict(guesses); names = {s['id']: s['name'] for s in suppliers}
+        sid = confident_supplier(guesses)
+        if sid in names:
+            self.statusBar().showMessage(f"Поставщик определён автоматически: {names[sid]} ({confidence[sid]:.0%})", 10000)
+            return sid
+        self.statusBar().clearMessage()
         from PySide6.QtWidgets import QInputDialog
-        items = ["<Создать нового>"] + [f"{s['id']}: {s['name']}" for s in suppliers]
-        item, ok = QInputDialog.getItem(self,"Поставщик","Выберите поставщика:", items, 0, False)
-        if not ok: return
+        items = ["<Создать нового>"] + [f"{s['id']}: {s['name']}" + (f"  (совпадение {confidence[s['id']]:.0%})" if s['id'] in confidence else "") for s in suppliers]
+        current = next((i for i, s in enumerate(suppliers, start=1) if guesses and s['id'] == guesses[0][0]), 0)
+        item, ok = QInputDialog.getItem(self,"Поставщик","Выберите поставщика:", items, current, False)
+        if not ok: return None
         if item=="<Создать нового>":
             name, ok2 = QInputDialog.getText(self,"Новый поставщик","Имя:")
-            if not ok2 or not name.strip(): return
-            sid = add_supplier(name.strip()); self.current_supplier_id = sid
-        else:
-            self.current_supplier_id = int(item.split(":")[0])
-        add_supplier_file_history(self.current_supplier_id, Path(path).name, list(df.columns))
-        mapping = map_columns_by_keywords(df)
-        proc = pd.DataFrame()
-        for file_col, logical in mapping.items():
-            if file_col in df.columns and logical in ("name","qty","price","sum"):
-                proc[logical] = df[file_col]
-        proc = clean_supplier_df(proc)
-        for c in ("qty","price","sum"):
-            if c in proc.columns:
-                proc[c] = proc[c].astype(str).str.replace('\xa0','').str.replace(' ','')
-                proc[c] = proc[c].str.replace(r'[^\d\.,\-]','',regex=True).str.replace(',','.')
-                proc[c] = pd.to_numeric(proc[c], errors='coerce').fillna(0)
-            else:
-                proc[c] = 0.0
-        preview = proc.copy(); rename_map={}
-        if 'name' in preview.columns: rename_map['name'] = 'Наименование'
-        if 'price' in preview.columns: rename_map['price'] = 'Цена'
-        if 'qty' in preview.columns: rename_map['qty'] = 'шт'
-        if 'sum' in preview.columns: rename_map['sum'] = 'Сумма'
-        preview = preview.rename(columns=rename_map)
-        self.current_processed_df = proc.reset_index(drop=True)
-        self.table.setModel(PandasModel(preview.head(200))); self.table.resizeColumnsToContents()
-        supplier_names = self.current_processed_df['name'].dropna().astype(str).str.strip().unique() if 'name' in self.current_processed_df.columns else []
-        mapped = sum(1 for n in supplier_names if get_product_mapping(self.current_supplier_id, n))
-        unmapped = len(supplier_names) - mapped
-        msg = f"Уникальных товаров: {len(supplier_names)}\nСопоставлено: {mapped}\nНе сопоставлено: {unmapped}"
-        if unmapped > 0:
+            if not ok2 or not name.strip(): return None
+            return add_supplier(name.strip())
+        return int(item.split(":")[0])
+
+    def apply_mapping(self, mapping, how):
+        from logic_mapping import LOGICAL_COLUMNS
+        self.current_mapping = mapping; self.columns_list.clear()
+        for c in self.current_df.columns:
+            self.columns_list.addItem(f"{c}  →  {LOGICAL_COLUMNS[mapping[c]]}" if mapping.get(c) in LOGICAL_COLUMNS else str(c))
+        self.lbl_info.setText(f"Файл: {Path(self.current_path).name} (колонки: {how})")
+        self.run_job(_process_file_job, self.current_path, self.current_df, mapping, self.current_supplier_id, on_result=self._on_file_processed, text="Обработка...")
+
+    def _on_file_processed(self, res):
+        proc, total, unmapped = res
+        self.current_processed_df = proc
+        self.show_preview(); self.table.resizeColumnsToContents()
+        # кандидаты для окна сопоставления — отдельной фоновой задачей, слот run_job не занимаем
+        if unmapped:
+            self.candidates_job = start_background_job(_match_candidates_job, self.current_supplier_id, unmapped,
+                                                       on_finished=self._on_candidates_finished)
+        msg = f"Уникальных товаров: {total}\nСопоставлено: {total - len(unmapped)}\nНе сопоставлено: {len(unmapped)}"
+        if unmapped:
             ans = QMessageBox.question(self,"Статус сопоставления", msg + "\n\nОткрыть окно сопоставления сейчас?")
             if ans == QMessageBox.Yes: self.open_matcher_window()
         else:
             QMessageBox.information(self,"Статус", msg)
 
+    def show_preview(self):
+        from pandas_model import PandasModel
+        preview = self.current_processed_df.copy(); rename_map={}
+        if 'name' in preview.columns: rename_map['name']='Наименование'
+        if 'price' in preview.columns: rename_map['price']='Цена'
+        if 'qty' in preview.columns: rename_map['qty']='шт'
+        if 'sum' in preview.columns: rename_map['sum']='Сумма'
+        preview = preview.rename(columns=rename_map)
+        self.table.setModel(PandasModel(preview))
+
     def open_mapping_dialog(self):
-        QMessageBox.information(self,"Мэппинг","Используйте окно 'Сопоставление товаров' для точного мэппинга.")
+        if self.current_mapping is None:
+            QMessageBox.warning(self,"Ошибка","Сначала откройте файл и выберите поставщика."); return
+        from ui_mapping_dialog import ColumnMappingDialog
+        from logic_mapping import remember_mapping
+        dlg = ColumnMappingDialog(self.current_df, self.current_mapping, self)
+        if not dlg.exec(): return
+        mapping = dlg.mapping()
+        remember_mapping(self.current_supplier_id, self.current_df.columns, mapping)
+        self.apply_mapping(mapping, "заданы вручную")
 
     def open_matcher_window(self):
         if self.current_supplier_id is None:
             QMessageBox.warning(self,"Ошибка","Сначала откройте файл и выберите поставщика."); return
-        supplier_products = self.current_processed_df['name'].dropna().astype(str).unique().tolist() if 'name' in self.current_processed_df.columns else []
+        if self.candidates_job is not None:
+            # окно само считает кандидатов в GUI-потоке — сначала дожидаемся фоновой задачи, она их уже сохраняет
+            self.matcher_pending = True; self.statusBar().showMessage("Подбор кандидатов для сопоставления...")
+            return
+        from ui_matcher import ProductMatchingWindow
+        proc = self.current_processed_df
+        # те же ключи, что в _process_file_job и match_candidates
+        supplier_products = proc['name'].dropna().astype(str).str.strip().unique().tolist() if proc is not None and 'name' in proc.columns else []
         dlg = ProductMatchingWindow(self, self.current_supplier_id, supplier_products); dlg.exec()
         self.load_my_products()
-        if not self.current_processed_df.empty:
-            preview = self.current_processed_df.copy(); rename_map={}
-            if 'name' in preview.columns: rename_map['name']='Наименование'
-            if 'price' in preview.columns: rename_map['price']='Цена'
-            if 'qty' in preview.columns: rename_map['qty']='шт'
-            if 'sum' in preview.columns: rename_map['sum']='Сумма'
-            preview = preview.rename(columns=rename_map)
-            self.table.setModel(PandasModel(preview.head(200)))
+        if proc is not None and not proc.empty:
+            self.show_preview()
+
+    def _on_candidates_finished(self, job):
+        if job is not self.candidates_job: return
+        self.candidates_job = None
+        if self.matcher_pending:
+            self.matcher_pending = False; self.statusBar().clearMessage(); self.open_matcher_window()
 
     def manage_suppliers(self):
         dlg = SupplierManagerDialog(self); dlg.exec(); self.load_my_products()
 
-    def open_product_info_from_item(self, item):
-        pid = item.data(Qt.UserRole); dlg = ProductInfoDialog(pid, self); dlg.exec()
+    def open_product_info_from_item(self, index):
+        from ui_product_info import ProductInfoDialog
+        pid = index.data(Qt.UserRole); dlg = ProductInfoDialog(pid, self); dlg.exec()
 
     def open_product_info_selected(self):
-        it = self.my_products_list.currentItem()
-        if not it: QMessageBox.warning(self,"Ошибка","Сначала выберите товар."); return
-        pid = it.data(Qt.UserRole); dlg = ProductInfoDialog(pid, self); dlg.exec()
+        idx = self.my_products_list.currentIndex()
+        if not idx.isValid(): QMessageBox.warning(self,"Ошибка","Сначала выберите товар."); return
+        from ui_product_info import ProductInfoDialog
+        pid = idx.data(Qt.UserRole); dlg = ProductInfoDialog(pid, self); dlg.exec()
+
+    def open_price_report(self):
+        from ui_price_report import PriceReportDialog
+        self.run_job(_price_report_job, on_result=lambda report: PriceReportDialog(report, self).exec(), text="Отчёт по ценам...")
 
     def generate_final(self):
         if self.current_processed_df is None or self.current_processed_df.empty:
             QMessageBox.warning(self,"Ошибка","Нет данных для экспорта."); return
-        df_final, price_updates = build_final_table(self.current_processed_df, self.current_supplier_id, get_product_mapping, lambda: get_all_products())
         path, _ = QFileDialog.getSaveFileName(self,"Сохранить итоговый файл","itog.xlsx","Excel Files (*.xlsx)")
         if not path: return
-        save_to_excel(df_final, path)
-        # update last_price and price history
-        for pid, price in price_updates:
-            try:
-                record_price_if_changed(pid, price)
-                conn = get_connection(); cur = conn.cursor(); cur.execute("UPDATE my_products SET last_price = ? WHERE id = ?", (price, pid)); conn.commit(); conn.close()
-            except Exception:
-                pass
-        QMessageBox.information(self,"Готово", f"Файл сохранён: {path}")
+        self.run_job(_export_job, self.current_processed_df, self.current_supplier_id, path,
+                     on_result=lambda p: QMessageBox.information(self,"Готово", f"Файл сохранён: {p}"), text="Формирование итогового файла...")
+
+    # -------------------------
+    # background jobs
+    # -------------------------
+    def run_job(self, fn, *args, on_result=None, text=""):
+        if self.current_job is not None:
+            QMessageBox.information(self,"Подождите","Дождитесь завершения текущей операции."); return None
+        self.progress.setValue(0); self.progress.setFormat(text or "%p%"); self.progress.show(); self.btn_cancel.show()
+        def deliver(res):
+            # освобождаем слот до вызова обработчика: он может запустить следующую задачу
+            self._on_job_finished(self.current_job)
+            if on_result: on_result(res)
+        self.current_job = start_job(fn, *args, on_result=deliver, on_error=self._on_job_error,
+                                     on_progress=self._on_job_progress, on_finished=self._on_job_finished)
+        return self.current_job
+
+    def cancel_job(self):
+        if self.current_job is not None: self.current_job.cancel()
+
+    def _on_job_progress(self, percent, text):
+        self.progress.setValue(percent)
+        if text: self.progress.setFormat(f"{text} %p%")
+
+    def _on_job_error(self, message):
+        QMessageBox.critical(self,"Ошибка", message)
+
+    def _on_job_finished(self, job):
+        if job is not self.current_job: return
+        self.current_job = None; self.progress.hide(); self.btn_cancel.hide()
+
+
+# Функции фоновых задач: выполняются в QThreadPool, не трогают виджеты
+def _startup_job(job):
+    if startup_backup_needed():  # при обновлении схемы бэкап уже снят в init_db, до миграций
+        rotate_backups()
+    # прогрев тяжёлых модулей, чтобы первое открытие файла не ждало импорта
+    import logic_import, logic_export, logic_price, logic_matching, pandas_model  # noqa: F401
+
+def _import_products_job(job, path):
+    import pandas as pd
+    from logic_products import import_products_from_df
+    from logic_import import iter_excel_chunks
+    job.report(5, "Чтение файла...")
+    # .xlsx читаем порциями и сразу оставляем две нужные колонки — весь лист в памяти не держим
+    chunks = iter_excel_chunks(path, dtype=str) if path.lower().endswith(".xlsx") else iter([pd.read_excel(path, dtype=str)])
+    parts = []; col_code = col_name = None
+    for df in chunks:
+        if not parts:
+            cols_lower = [str(c).lower() for c in df.columns]
+            for i,c in enumerate(cols_lower):
+                if any(k in c for k in ("код","code","артикул","sku","id")) and col_code is None: col_code = df.columns[i]
+                if any(k in c for k in ("наимен","name","товар")) and col_name is None: col_name = df.columns[i]
+            if not col_code or not col_name:
+                raise ValueError("Файл должен содержать колонки Код и Наименование.")
+        parts.append(df[[col_code, col_name]].rename(columns={col_code:"code", col_name:"name"}).dropna(subset=["code","name"]))
+    if not parts:
+        raise ValueError("Файл должен содержать колонки Код и Наименование.")
+    df2 = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    job.report(30, "Импорт...")
+    return import_products_from_df(df2, replace_all=False, progress=lambda done: job.report(30 + 70*done, "Импорт..."))
+
+def _read_file_job(job, path):
+    from logic_import import read_supplier_head
+    from logic_suppliers import detect_supplier
+    job.report(5, "Чтение файла...")
+    df = read_supplier_head(path)  # большой .xlsx целиком прочитает _process_file_job, порциями
+    df.columns = [str(c).strip() for c in df.columns]
+    job.report(90, "Определение поставщика...")
+    guesses = detect_supplier(path, df)
+    job.report(100, "Чтение файла...")
+    return path, df, guesses
+
+def _process_file_job(job, path, df, mapping, supplier_id):
+    from logic_import import prepare_supplier_file
+    job.report(10, "Очистка данных...")
+    proc = prepare_supplier_file(path, mapping, head=df)
+    job.report(70, "Проверка сопоставлений...")
+    supplier_names = proc['name'].dropna().astype(str).str.strip().unique() if 'name' in proc.columns else []
+    mappings = get_product_mappings_bulk(supplier_id, supplier_names)
+    unmapped = [n for n in supplier_names if not mappings.get(n)]
+    return proc, len(supplier_names), unmapped
+
+def _match_candidates_job(job, supplier_id, names):
+    # заранее заполняет match_candidates: окно сопоставления потом берёт готовое (refresh_match_candidates)
+    from logic_matching import refresh_match_candidates
+    refresh_match_candidates(supplier_id, names, progress=lambda done: job.report(100*done))
+
+def _price_report_job(job):
+    from logic_price import price_change_report
+    job.report(0, "Отчёт по ценам...")
+    return price_change_report(progress=lambda done: job.report(100*done, "Отчёт по ценам..."))
+
+def _export_job(job, proc, supplier_id, path):
+    from logic_export import build_final_table, save_to_excel
+    from logic_price import record_prices
+    job.report(10, "Сборка таблицы...")
+    df_final, price_updates = build_final_table(proc, supplier_id, get_product_mappings_bulk, lambda: get_catalog().by_id)
+    job.report(40, "Сохранение...")
+    save_to_excel(df_final, path)
+    # update last_price and price history
+    job.report(70, "Обновление цен...")
+    record_prices(price_updates)
+    return path
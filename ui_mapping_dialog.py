@@ -0,0 +1,43 @@
+# ui_mapping_dialog.py
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QComboBox, QPushButton, QMessageBox, QScrollArea, QWidget
+from logic_mapping import LOGICAL_COLUMNS
+
+SAMPLE_VALUES = 3
+
+class ColumnMappingDialog(QDialog):
+    """Ручное сопоставление колонок файла с логическими (name, qty, price, sum); результат — mapping()."""
+    def __init__(self, df, mapping, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сопоставление колонок")
+        self.resize(720, 480)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("<b>Какие данные в каждой колонке файла?</b> Сопоставление запомнится для файлов этого поставщика с таким же заголовком."))
+        grid = QGridLayout(); grid.addWidget(QLabel("<b>Колонка</b>"), 0, 0); grid.addWidget(QLabel("<b>Примеры значений</b>"), 0, 1); grid.addWidget(QLabel("<b>Данные</b>"), 0, 2)
+        self.combos = {}
+        for row, col in enumerate(df.columns, start=1):
+            samples = df[col].dropna().astype(str).str.strip()
+            samples = ", ".join(s for s in samples[samples.ne("")].head(SAMPLE_VALUES))
+            lbl_samples = QLabel(samples); lbl_samples.setStyleSheet("color: #6b7280;")
+            combo = QComboBox(); combo.addItem("— не использовать", None)
+            for logical, title in LOGICAL_COLUMNS.items(): combo.addItem(title, logical)
+            combo.setCurrentIndex(max(0, combo.findData(mapping.get(col))))
+            grid.addWidget(QLabel(str(col)), row, 0); grid.addWidget(lbl_samples, row, 1); grid.addWidget(combo, row, 2)
+            self.combos[col] = combo
+        grid.setColumnStretch(1, 1)
+        body = QWidget(); body.setLayout(grid); scroll = QScrollArea(); scroll.setWidgetResizable(True); scroll.setWidget(body); layout.addWidget(scroll)
+        btns = QHBoxLayout(); btns.addStretch()
+        btn_ok = QPushButton("Применить"); btn_ok.clicked.connect(self.apply); btns.addWidget(btn_ok)
+        btn_cancel = QPushButton("Отмена"); btn_cancel.clicked.connect(self.reject); btns.addWidget(btn_cancel)
+        layout.addLayout(btns)
+
+    def mapping(self):
+        return {col: combo.currentData() for col, combo in self.combos.items()}
+
+    def apply(self):
+        chosen = [v for v in self.mapping().values() if v]
+        if "name" not in chosen:
+            QMessageBox.warning(self, "Сопоставление", "Укажите колонку с наименованием."); return
+        dup = sorted({LOGICAL_COLUMNS[v] for v in chosen if chosen.count(v) > 1})
+        if dup:
+            QMessageBox.warning(self, "Сопоставление", "Одни и те же данные выбраны для нескольких колонок: " + ", ".join(dup)); return
+        self.accept()
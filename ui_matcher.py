@@ -2,15 +2,9 @@
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QPushButton, QLineEdit, QLabel, QRadioButton, QButtonGroup, QMessageBox, QListWidgetItem, QSplitter, QWidget, QCheckBox, QDialogButtonBox
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
-from db import get_all_products, save_product_mapping, get_all_product_mappings_for_supplier, get_product_mapping
-try:
-    from rapidfuzz import fuzz
-    def similarity(a,b):
-        return fuzz.token_set_ratio(str(a), str(b))
-except Exception:
-    import difflib
-    def similarity(a,b):
-        return int(difflib.SequenceMatcher(None, str(a), str(b)).ratio()*100)
+from db import save_product_mapping, get_all_product_mappings_for_supplier, get_product_mapping, transaction
+from logic_matching import refresh_match_candidates
+from logic_products import get_catalog
 
 class AutoConfirmDialog(QDialog):
     def __init__(self, parent, suggestions, my_products):
@@ -57,7 +51,7 @@ class ProductMatchingWindow(QDialog):
         splitter = QSplitter(Qt.Horizontal)
         left_w = QWidget(); left_l = QVBoxLayout(left_w); left_l.addWidget(QLabel("Мои товары")); self.list_my = QListWidget(); self.list_my.setAlternatingRowColors(True); left_l.addWidget(self.list_my); splitter.addWidget(left_w)
         center_w = QWidget(); center_l = QVBoxLayout(center_w); center_l.addStretch(); self.btn_link = QPushButton("Связать →"); self.btn_link.clicked.connect(self.link); center_l.addWidget(self.btn_link); center_l.addStretch(); splitter.addWidget(center_w)
-        right_w = QWidget(); right_l = QVBoxLayout(right_w); right_l.addWidget(QLabel("Товары поставщика")); self.list_sup = QListWidget(); self.list_sup.setAlternatingRowColors(True); self.list_sup.setSelectionMode(QListWidget.ExtendedSelection); right_l.addWidget(self.list_sup); splitter.addWidget(right_w)
+        right_w = QWidget(); right_l = QVBoxLayout(right_w); right_l.addWidget(QLabel("Товары поставщика")); self.list_sup = QListWidget(); self.list_sup.setAlternatingRowColors(True); self.list_sup.setSelectionMode(QListWidget.ExtendedSelection); self.list_sup.currentItemChanged.connect(self.show_best_candidate); right_l.addWidget(self.list_sup); splitter.addWidget(right_w)
         layout.addWidget(splitter,6)
         bottom_h = QHBoxLayout()
         self.btn_auto = QPushButton("Автосопоставить (threshold=85)"); self.btn_auto.clicked.connect(self.auto_suggest_and_confirm)
@@ -71,7 +65,7 @@ class ProductMatchingWindow(QDialog):
         self.load_lists(); self.apply_filter()
 
     def load_lists(self):
-        self.my_products = list(get_all_products())
+        self.my_products = get_catalog().records
         self.list_my.clear()
         for p in self.my_products:
             code = p['code'] if "code" in p.keys() and p['code'] else ''
@@ -83,12 +77,17 @@ class ProductMatchingWindow(QDialog):
 
         unmatched = [s for s in self.supplier_products if s not in mapped_names]
         matched = [s for s in self.supplier_products if s in mapped_names]
+        # кандидаты из match_candidates: для уже виденных имён пересчитывается только изменившееся в каталоге
+        self.candidates = refresh_match_candidates(self.supplier_id, unmatched)
+        names = get_catalog().by_id
 
         self.list_sup.clear()
         for s in unmatched + matched:
             it = QListWidgetItem(s)
             if s in mapped_names:
                 it.setBackground(QColor("#dff7e6"))
+            elif self.candidates.get(s):
+                it.setToolTip("Похожие:\n" + "\n".join(f"{names[mid].my_name}  ({score:.0f})" for mid, score in self.candidates[s] if mid in names))
             self.list_sup.addItem(it)
 
         self.list_links.clear()
@@ -132,17 +131,18 @@ class ProductMatchingWindow(QDialog):
                     show = False
             it.setHidden(not show)
 
+    def show_best_candidate(self, current, previous=None):
+        """Выделяет слева лучший сохранённый кандидат для выбранной строки поставщика."""
+        best = self.candidates.get(current.text()) if current is not None else None
+        if not best: return
+        for i in range(self.list_my.count()):
+            it = self.list_my.item(i)
+            if it.data(Qt.UserRole) == best[0][0] and not it.isHidden():
+                self.list_my.setCurrentItem(it); self.list_my.scrollToItem(it); return
+
     def auto_suggest(self, threshold=85):
-        suggestions = []
-        for s in self.supplier_products:
-            best = (None, 0)
-            for p in self.my_products:
-                sc = similarity(s.lower(), p['my_name'].lower())
-                if sc > best[1]:
-                    best = (p['id'], sc)
-            if best[1] >= threshold:
-                suggestions.append((s, best[0], best[1]))
-        return suggestions
+        # лучший кандидат каждой несопоставленной строки — из посчитанных при открытии окна
+        return [(s, c[0][0], c[0][1]) for s, c in self.candidates.items() if c and c[0][1] >= threshold]
 
     def auto_suggest_and_confirm(self):
         suggestions = self.auto_suggest(threshold=85)
@@ -152,8 +152,9 @@ class ProductMatchingWindow(QDialog):
         dlg = AutoConfirmDialog(self, suggestions, self.my_products)
         if dlg.exec():
             chosen = dlg.get_selected()
-            for sup, mid in chosen:
-                save_product_mapping(self.supplier_id, sup, mid)
+            with transaction():
+                for sup, mid in chosen:
+                    save_product_mapping(self.supplier_id, sup, mid)
             QMessageBox.information(self, "Готово", f"Применено {len(chosen)} сопоставлений.")
             self.load_lists()
 
@@ -167,8 +168,9 @@ class ProductMatchingWindow(QDialog):
         if not sel:
             QMessageBox.warning(self, "Ошибка", "Выберите товары справа")
             return
-        for it in sel:
-            sup_name = it.text().strip()
-            save_product_mapping(self.supplier_id, sup_name, my_id)
+        with transaction():
+            for it in sel:
+                sup_name = it.text().strip()
+                save_product_mapping(self.supplier_id, sup_name, my_id)
         QMessageBox.information(self, "Готово", f"Связано {len(sel)} позиций")
         self.load_lists()
@@ -0,0 +1,39 @@
+# ui_price_report.py
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableView, QPushButton, QFileDialog, QMessageBox
+from PySide6.QtCore import Qt
+from pandas_model import PandasModel
+from logic_export import price_report_table, save_to_excel
+from ui_product_info import ProductInfoDialog
+
+class PriceReportDialog(QDialog):
+    """Изменение цен по всему каталогу (logic_price.price_change_report)."""
+    def __init__(self, report, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Отчёт по изменению цен")
+        self.resize(1100, 640)
+        self.table_df = price_report_table(report)
+        layout = QVBoxLayout(self)
+        change = report['change_pct']
+        layout.addWidget(QLabel(f"<b>Товаров с историей цен:</b> {len(report)} &nbsp;&nbsp; "
+                                f"<b>Подорожало:</b> <span style='color:#059669'>{int((change > 0).sum())}</span> &nbsp;&nbsp; "
+                                f"<b>Подешевело:</b> <span style='color:#dc2626'>{int((change < 0).sum())}</span>"))
+        self.view = QTableView(); self.view.setAlternatingRowColors(True); self.view.setSortingEnabled(True)
+        self.view.setModel(PandasModel(self.table_df, self.view)); self.view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.view.doubleClicked.connect(self.open_product_info); layout.addWidget(self.view)
+        btns = QHBoxLayout(); btns.addStretch()
+        btn_export = QPushButton("Экспорт в Excel"); btn_export.clicked.connect(self.export); btns.addWidget(btn_export)
+        btn_close = QPushButton("Закрыть"); btn_close.clicked.connect(self.accept); btns.addWidget(btn_close)
+        layout.addLayout(btns)
+
+    def open_product_info(self, index):
+        pid = int(index.siblingAtColumn(0).data())
+        ProductInfoDialog(pid, self).exec()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self,"Сохранить отчёт","price_report.xlsx","Excel Files (*.xlsx)")
+        if not path: return
+        try:
+            save_to_excel(self.table_df, path)
+        except Exception as e:
+            QMessageBox.critical(self,"Ошибка", str(e)); return
+        QMessageBox.information(self,"Готово", f"Файл сохранён: {path}")
@@ -1,9 +1,47 @@
 # ui_product_info.py
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QPushButton, QHBoxLayout
+import numpy as np
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableView, QHeaderView, QPushButton, QHBoxLayout
 from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis, QCategoryAxis
-from PySide6.QtGui import QColor, QPen
-from PySide6.QtCore import Qt
-from db import get_connection, get_price_history_for_product
+from PySide6.QtGui import QColor, QPen, QPainter
+from PySide6.QtCore import Qt, QPointF, QAbstractTableModel, QModelIndex
+from db import connection, get_price_history_for_product, get_price_rollups, get_price_summary
+from logic_price import price_deltas, rolling_mean, lttb
+
+CHART_POINTS = 500   # больше точек на графике глаз всё равно не различит
+ROLLING_WINDOW = 7
+
+class PriceHistoryModel(QAbstractTableModel):
+    """История цен: текст и цвет ячейки считаются только для видимых строк."""
+    HEADERS = ["Дата","Цена","Δ от предыдущей","Накопленное Δ"]
+    GREEN, RED = QColor("#059669"), QColor("#dc2626")
+
+    def __init__(self, dates, prices, deltas, acc, parent=None):
+        super().__init__(parent)
+        self._cols = (dates, prices.tolist(), deltas.tolist(), acc.tolist())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cols[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 4
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ForegroundRole):
+            return None
+        row, col = index.row(), index.column()
+        v = self._cols[col][row]
+        if col == 2 and row == 0:
+            return "" if role == Qt.DisplayRole else None
+        if role == Qt.ForegroundRole:
+            if col < 2: return None
+            return self.GREEN if v > 0 else self.RED if v < 0 else None
+        if col == 0: return v
+        return f"{v:.2f}" if col == 1 else f"{v:+.2f}"
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return self.HEADERS[section] if orientation == Qt.Horizontal else str(section + 1)
 
 class ProductInfoDialog(QDialog):
     def __init__(self, product_id: int, parent=None):
@@ -11,9 +49,9 @@ class ProductInfoDialog(QDialog):
         self.setWindowTitle("Информация о товаре")
         self.resize(920, 620)
         layout = QVBoxLayout(self)
-        conn = get_connection(); cur = conn.cursor()
+        cur = connection().cursor()
         cur.execute("SELECT id, my_name, code, category, created_at, last_price FROM my_products WHERE id = ?", (product_id,))
-        row = cur.fetchone(); conn.close()
+        row = cur.fetchone()
         name = row["my_name"] if row and "my_name" in row.keys() else f"#{product_id}"
         code = row["code"] if row and "code" in row.keys() else ""
         created = row["created_at"] if row and "created_at" in row.keys() else ""
@@ -21,53 +59,42 @@ class ProductInfoDialog(QDialog):
         header = QLabel(f"<h2>{name}</h2><b>Код:</b> {code} &nbsp;&nbsp; <b>Создан:</b> {created} <br> <b>Последняя цена:</b> {last_price or '-'}")
         header.setTextFormat(Qt.RichText); layout.addWidget(header)
         history = get_price_history_for_product(product_id)
-        tbl = QTableWidget(); tbl.setColumnCount(4); tbl.setHorizontalHeaderLabels(["Дата","Цена","Δ от предыдущей","Накопленное Δ"]); tbl.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        tbl.setRowCount(len(history))
-        prev = None; acc = 0.0; diffs=[]
-        for i, rec in enumerate(history):
-            date = rec.get("date", "") if isinstance(rec, dict) else rec["date"]
-            price = float(rec.get("price", 0) if isinstance(rec, dict) else rec["price"])
-            if prev is None:
-                delta = 0.0
-            else:
-                delta = round(price - prev, 2)
-            acc += delta
-            tbl.setItem(i,0, QTableWidgetItem(str(date))); tbl.setItem(i,1, QTableWidgetItem(f"{price:.2f}"))
-            item_d = QTableWidgetItem(f"{delta:+.2f}" if prev is not None else "")
-            if prev is not None:
-                if delta>0: item_d.setForeground(QColor("#059669"))
-                elif delta<0: item_d.setForeground(QColor("#dc2626"))
-            tbl.setItem(i,2,item_d)
-            item_acc = QTableWidgetItem(f"{acc:+.2f}")
-            if acc>0: item_acc.setForeground(QColor("#059669"))
-            elif acc<0: item_acc.setForeground(QColor("#dc2626"))
-            tbl.setItem(i,3,item_acc)
-            prev = price; diffs.append(delta)
+        dates = [str(rec["date"]) for rec in history]
+        prices = np.array([float(rec["price"]) for rec in history])
+        deltas, acc = price_deltas(prices)
+        tbl = QTableView(); tbl.setModel(PriceHistoryModel(dates, prices, deltas, acc, tbl)); tbl.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(tbl)
-        total_change = sum(d for d in diffs if isinstance(d,(int,float)))
+        total_change = float(acc[-1]) if len(acc) else 0.0
         summary = QLabel(f"<b>Итоговое изменение (сумма всех Δ):</b> {total_change:+.2f}")
         if total_change>0: summary.setStyleSheet("color:#059669;")
         elif total_change<0: summary.setStyleSheet("color:#dc2626;")
         layout.addWidget(summary)
+        stats = get_price_summary(product_id)  # из price_rollups, без прохода по всей истории
+        if stats:
+            text = f"<b>Мин:</b> {stats['min']:.2f} &nbsp;&nbsp; <b>Макс:</b> {stats['max']:.2f} &nbsp;&nbsp; <b>Средняя:</b> {stats['avg']:.2f}"
+            months = get_price_rollups(product_id, "month")
+            if months:
+                m = months[-1]
+                text += f" &nbsp;&nbsp; <b>{m['bucket']}:</b> {m['min_price']:.2f} – {m['max_price']:.2f}, средняя {m['avg_price']:.2f} ({m['n']} зап.)"
+            layout.addWidget(QLabel(text))
         if history:
+            ys = prices[::-1]; xs = np.arange(len(ys)); dates_rev = dates[::-1]
+            keep = lttb(xs, ys, CHART_POINTS)
             series = QLineSeries(); series.setColor(QColor("#1E88E5")); series.setPen(QPen(QColor("#1E88E5"),2))
-            hist_rev = list(reversed(history))
-            for idx,rec in enumerate(hist_rev):
-                price_val = float(rec.get("price", 0) if isinstance(rec, dict) else rec["price"])
-                series.append(idx, price_val)
-            chart = QChart(); chart.addSeries(series); chart.setTitle("Динамика цены (старые → новые)")
-            axis_x = QCategoryAxis(); axis_x.setLabelsPosition(QCategoryAxis.Center)
-            step = max(1, len(hist_rev)//6)
-            for i in range(0, len(hist_rev), step):
-                d = hist_rev[i].get("date", "") if isinstance(hist_rev[i], dict) else hist_rev[i]["date"]
-                axis_x.append(str(d), i)
-            last_d = hist_rev[-1].get("date", "") if isinstance(hist_rev[-1], dict) else hist_rev[-1]["date"]
-            axis_x.append(str(last_d), len(hist_rev)-1)
-            ys = [float(r.get("price",0) if isinstance(r, dict) else r["price"]) for r in hist_rev]
-            ymin = min(ys)*0.95 if ys else 0
-            ymax = max(ys)*1.05 if ys else 1
-            axis_y = QValueAxis(); axis_y.setRange(ymin, ymax)
+            series.replace([QPointF(float(x), float(y)) for x, y in zip(xs[keep], ys[keep])])
+            avg = rolling_mean(ys, ROLLING_WINDOW)
+            avg_series = QLineSeries(); avg_series.setName(f"Среднее за {ROLLING_WINDOW}"); avg_series.setPen(QPen(QColor("#F59E0B"),1,Qt.DashLine))
+            avg_series.replace([QPointF(float(x), float(y)) for x, y in zip(xs[keep], avg[keep])])
+            chart = QChart(); chart.addSeries(series); chart.addSeries(avg_series); chart.setTitle("Динамика цены (старые → новые)")
+            chart.legend().hide()
+            axis_x = QCategoryAxis(); axis_x.setLabelsPosition(QCategoryAxis.AxisLabelsPosition.AxisLabelsPositionCenter)
+            step = max(1, len(ys)//6)
+            for i in range(0, len(ys), step):
+                axis_x.append(dates_rev[i], i)
+            axis_x.append(dates_rev[-1], len(ys)-1)
+            axis_y = QValueAxis(); axis_y.setRange(stats['min']*0.95, stats['max']*1.05)
             chart.addAxis(axis_x, Qt.AlignBottom); chart.addAxis(axis_y, Qt.AlignLeft)
-            series.attachAxis(axis_x); series.attachAxis(axis_y)
-            chart_view = QChartView(chart); chart_view.setRenderHint(QChartView.Antialiasing); layout.addWidget(chart_view)
+            for s in (series, avg_series):
+                s.attachAxis(axis_x); s.attachAxis(axis_y)
+            chart_view = QChartView(chart); chart_view.setRenderHint(QPainter.Antialiasing); layout.addWidget(chart_view)
         btns = QHBoxLayout(); btns.addStretch(); close = QPushButton("Закрыть"); close.clicked.connect(self.accept); btns.addWidget(close); layout.addLayout(btns)
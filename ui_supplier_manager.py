@@ -1,7 +1,8 @@
 # ui_supplier_manager.py
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, QInputDialog, QMessageBox, QLineEdit
 from PySide6.QtCore import Qt
-from db import get_suppliers, add_supplier, rename_supplier, delete_supplier
+from db import get_suppliers, get_supplier, add_supplier, rename_supplier, delete_supplier, set_supplier_pattern
+from logic_suppliers import split_patterns, pattern_errors
 
 class SupplierManagerDialog(QDialog):
     def __init__(self, parent=None):
@@ -15,6 +16,7 @@ class SupplierManagerDialog(QDialog):
         btns = QHBoxLayout()
         btn_add = QPushButton("Добавить"); btn_add.clicked.connect(self.add_supplier); btns.addWidget(btn_add)
         btn_rename = QPushButton("Переименовать"); btn_rename.clicked.connect(self.rename_supplier_clicked); btns.addWidget(btn_rename)
+        btn_patterns = QPushButton("Шаблоны"); btn_patterns.clicked.connect(self.edit_patterns); btns.addWidget(btn_patterns)
         btn_delete = QPushButton("Удалить"); btn_delete.clicked.connect(self.delete_supplier); btns.addWidget(btn_delete)
         btn_close = QPushButton("Закрыть"); btn_close.clicked.connect(self.close); btns.addWidget(btn_close)
         layout.addLayout(btns)
@@ -23,8 +25,9 @@ class SupplierManagerDialog(QDialog):
     def load_suppliers(self):
         self.list.clear()
         for s in get_suppliers():
-            it = QListWidgetItem(f"{s['id']}: {s['name']}")
-            it.setData(Qt.UserRole, s['id'])
+            patterns = split_patterns(s['pattern'])
+            it = QListWidgetItem(f"{s['id']}: {s['name']}" + (f"  [шаблонов: {len(patterns)}]" if patterns else ""))
+            it.setData(Qt.UserRole, s['id']); it.setToolTip("\n".join(patterns) or "Шаблоны не заданы")
             self.list.addItem(it)
 
     def add_supplier(self):
@@ -36,11 +39,25 @@ class SupplierManagerDialog(QDialog):
         it = self.list.currentItem()
         if not it:
             QMessageBox.information(self, "Ошибка", "Выберите поставщика"); return
-        sid = it.data(Qt.UserRole); old = it.text().split(": ",1)[1]
+        sid = it.data(Qt.UserRole); old = get_supplier(sid)['name']
         new, ok = QInputDialog.getText(self, "Переименовать", "Новое имя:", QLineEdit.Normal, old)
         if not ok or not new.strip(): return
         rename_supplier(sid, new.strip()); self.load_suppliers()
 
+    def edit_patterns(self):
+        it = self.list.currentItem()
+        if not it:
+            QMessageBox.information(self, "Ошибка", "Выберите поставщика"); return
+        sid = it.data(Qt.UserRole)
+        text, ok = QInputDialog.getMultiLineText(self, "Шаблоны поставщика",
+            "По одному в строке: название, ИНН, часть имени файла.\nРегулярное выражение — с префиксом re:, например re:ИНН\\s*7701",
+            get_supplier(sid)['pattern'] or "")
+        if not ok: return
+        errors = pattern_errors(text)
+        if errors:
+            QMessageBox.warning(self, "Ошибка в шаблоне", "\n".join(f"{p}: {e}" for p, e in errors)); return
+        set_supplier_pattern(sid, "\n".join(split_patterns(text))); self.load_suppliers()
+
     def delete_supplier(self):
         it = self.list.currentItem()
         if not it: